@@ -1,3 +1,4 @@
+import os
 from os.path import abspath, dirname, join
 
 __version__ = "0.0.2"
@@ -5,3 +6,4 @@ PACKAGE_DIR = dirname(abspath(__file__))
 PROJECT_DIR = dirname(dirname(PACKAGE_DIR))
 SITE_DIR = join(PROJECT_DIR, "docs")
 DATA_DIR = join(PROJECT_DIR, "data")
+CACHE_DIR = os.environ.get("COVID19_CACHE_DIR", join(PROJECT_DIR, ".cache"))
@@ -0,0 +1,149 @@
+"""Windowed trend statistics of grouped daily series.
+
+Moving averages, week-over-week growth, Rt-style ratios and doubling times
+are computed for every group and column at once: windows are differences of
+one cumulative sum over the frame, so the cost is O(rows) whatever the
+window and the number of groups. Rows must be in time order within each
+group, as for `covid_19_ita.transforms`.
+
+`update` stores the statistics with `covid_19_ita.ingest`, so that new days
+only cost the rows they affect.
+"""
+import numpy as np
+import pandas as pd
+
+from covid_19_ita import ingest
+from covid_19_ita.transforms import group_ids
+
+WINDOW = 7
+RT_WINDOW = 4
+
+
+def _layout(frame, by):
+    """Stable order of the rows by group and position of each sorted row
+    within its group."""
+    ids = group_ids(frame, by)
+    order = np.argsort(ids, kind="stable")
+    ids = ids[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    lengths = np.diff(np.r_[starts, len(ids)])
+    position = np.arange(len(ids)) - np.repeat(starts, lengths)
+    return order, position
+
+
+def _lag(values, position, k):
+    lagged = np.full(len(values), np.nan)
+    lagged[k:] = values[:-k] if k else values
+    lagged[position < k] = np.nan
+    return lagged
+
+
+def _window_sum(values, position, window, min_periods):
+    """Trailing `window` sums of `values` and number of values summed."""
+    present = ~np.isnan(values)
+    sums = np.r_[0.0, np.cumsum(np.where(present, values, 0.0))]
+    counts = np.r_[0, np.cumsum(present)]
+    stop = np.arange(1, len(values) + 1)
+    begin = stop - np.minimum(position + 1, window)
+    total = sums[stop] - sums[begin]
+    count = counts[stop] - counts[begin]
+    total[count < min_periods] = np.nan
+    return total, count
+
+
+def _apply(frame, columns, by, suffix, stat):
+    order, position = _layout(frame, by)
+    result = {}
+    for col in columns:
+        values = frame[col].to_numpy(dtype=np.float64)[order]
+        out = np.empty(len(values))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[order] = stat(values, position)
+        result[col + suffix] = out
+    return pd.DataFrame(result, index=frame.index)
+
+
+def rolling_mean(frame, columns, window=WINDOW, by=None, min_periods=None):
+    """Trailing `window`-day mean, NaN until `min_periods` (default
+    `window`) values are available."""
+    min_periods = window if min_periods is None else min_periods
+
+    def stat(values, position):
+        total, count = _window_sum(values, position, window, min_periods)
+        return total / count
+
+    return _apply(frame, columns, by, f"_ma{window}", stat)
+
+
+def growth(frame, columns, window=WINDOW, by=None):
+    """Growth of the trailing `window`-day total over the previous one, e.g.
+    week-over-week growth of daily cases (0.1 is +10%)."""
+
+    def stat(values, position):
+        total, _ = _window_sum(values, position, window, window)
+        return total / _lag(total, position, window) - 1
+
+    return _apply(frame, columns, by, "_growth", stat)
+
+
+def rt_ratio(frame, columns, window=RT_WINDOW, by=None):
+    """Rt-style ratio of the daily `columns`: total of the last `window`
+    days over the total of the `window` days before (RKI estimator)."""
+
+    def stat(values, position):
+        total, _ = _window_sum(values, position, window, window)
+        return total / _lag(total, position, window)
+
+    return _apply(frame, columns, by, "_rt", stat)
+
+
+def doubling_time(frame, columns, window=WINDOW, by=None):
+    """Days for the cumulative `columns` to double at the growth rate of the
+    last `window` days, NaN when they did not grow or grew from 0."""
+
+    def stat(values, position):
+        lag = _lag(values, position, window)
+        ratio = values / lag
+        days = window * np.log(2) / np.log(ratio)
+        days[~(lag > 0) | ~np.isfinite(ratio) | ~(ratio > 1)] = np.nan
+        return days
+
+    return _apply(frame, columns, by, "_doubling", stat)
+
+
+def trends(frame, daily, cumulative=(), by=None, window=WINDOW):
+    """All the statistics above of the `daily` and `cumulative` columns."""
+    return pd.concat(
+        [
+            rolling_mean(frame, daily, window, by),
+            growth(frame, daily, window, by),
+            rt_ratio(frame, daily, by=by),
+            doubling_time(frame, cumulative, window, by),
+        ],
+        axis=1,
+    )
+
+
+def update(
+    name,
+    fresh,
+    keys,
+    daily,
+    cumulative=(),
+    version="",
+    time_col="time",
+    window=WINDOW,
+):
+    """`fresh` joined with its `trends` per `keys`, recomputed only from the
+    first day added or revised since the last call."""
+    return ingest.update(
+        name,
+        fresh,
+        keys=keys,
+        derive=lambda frame: frame.assign(
+            **trends(frame, daily, cumulative, by=keys, window=window)
+        ),
+        version=f"{version}-{window}",
+        time_col=time_col,
+        context=2 * max(window, RT_WINDOW),
+    )
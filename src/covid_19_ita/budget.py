@@ -0,0 +1,74 @@
+"""Loader for the MEF "Legge di Bilancio" open data kept in ``DATA_DIR``.
+
+Files are named ``<year>---Legge-di-Bilancio---<NN>-<Ministero>---...csv``.
+Only the requested columns are parsed and rows are filtered chunk by chunk
+while reading, so more fiscal years and ministries in ``DATA_DIR`` do not
+grow the frames handed to the figures.
+"""
+import glob
+import os
+import re
+from os.path import join
+
+import pandas as pd
+
+from covid_19_ita import DATA_DIR
+
+FILE_PATTERN = re.compile(r"^(\d{4})---Legge-di-Bilancio---(\d{2})-")
+CHUNKSIZE = 10_000
+
+COLUMNS = [
+    "Esercizio Finanziario",
+    "Descrizione Amministrazione",
+    "Descrizione Missione",
+    "Descrizione Programma",
+    "Descrizione Azione",
+    "Denominazione Capitolo",
+    "Previsioni iniziali competenza",
+]
+
+
+def budget_files(years=None, ministries=None, data_dir=DATA_DIR):
+    """Budget csv paths, optionally restricted to `years` and `ministries`.
+
+    `ministries` are the two-digit "Stato di Previsione" codes (2 is
+    Economia e Finanze, 15 is Salute).
+    """
+    paths = []
+    for path in sorted(glob.glob(join(data_dir, "*Legge-di-Bilancio*.csv"))):
+        match = FILE_PATTERN.match(os.path.basename(path))
+        if not match:
+            continue
+        year, ministry = int(match.group(1)), int(match.group(2))
+        if years is not None and year not in years:
+            continue
+        if ministries is not None and ministry not in ministries:
+            continue
+        paths.append(path)
+    return paths
+
+
+def load_budget(
+    programmi=None,
+    columns=COLUMNS,
+    years=None,
+    ministries=None,
+    chunksize=CHUNKSIZE,
+    data_dir=DATA_DIR,
+) -> pd.DataFrame:
+    """Rows of the budget files whose "Descrizione Programma" is in
+    `programmi` (all rows if None), restricted to `columns`."""
+    usecols = list(columns)
+    if programmi is not None and "Descrizione Programma" not in usecols:
+        usecols.append("Descrizione Programma")
+
+    chunks = []
+    for path in budget_files(years, ministries, data_dir=data_dir):
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize):
+            if programmi is not None:
+                chunk = chunk[chunk["Descrizione Programma"].isin(programmi)]
+            chunks.append(chunk)
+
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(chunks, ignore_index=True)[list(columns)]
@@ -0,0 +1,146 @@
+"""On-disk cache of parsed datasets.
+
+Parsed frames are stored as Arrow snapshots under ``CACHE_DIR/snapshots``.
+Entries are keyed by the sha256 of the raw source and by the parser version,
+so each source is parsed once per upstream data update instead of once per
+figure, and build workers share the memory-mapped result.
+"""
+import hashlib
+import io
+import logging
+from datetime import date
+
+import covid_health
+import pandas as pd
+from covid_health import prep_ecdc, prep_owid
+
+from covid_19_ita import snapshot
+from covid_19_ita.fetch import fetch
+from covid_19_ita.schema import compact
+
+logger = logging.getLogger("covid_19_ita")
+
+# Bump when the post-processing applied on top of `covid_health` changes.
+PARSER_VERSION = "3"
+
+DPC_SOURCES = {
+    "dpc-regions": (
+        "https://raw.githubusercontent.com/pcm-dpc/COVID-19/master/"
+        "dati-regioni/dpc-covid19-ita-regioni.csv"
+    ),
+    "dpc-province": (
+        "https://raw.githubusercontent.com/pcm-dpc/COVID-19/master/"
+        "dati-province/dpc-covid19-ita-province.csv"
+    ),
+}
+# Columns of the DPC files as named by `covid_health`, the others are kept.
+DPC_COLUMNS = {
+    "data": "time",
+    "codice_regione": "region_code",
+    "denominazione_regione": "region",
+    "codice_provincia": "province_code",
+    "denominazione_provincia": "province",
+    "sigla_provincia": "province_abbr",
+    "ricoverati_con_sintomi": "n_hospitalized",
+    "terapia_intensiva": "n_intensive_care",
+    "totale_ospedalizzati": "tot_n_hospitalized",
+    "isolamento_domiciliare": "n_home_quarantine",
+    "dimessi_guariti": "n_discharged_recovered",
+    "deceduti": "n_deceased",
+    "totale_casi": "tot_n_cases",
+    "tamponi": "n_tested",
+}
+
+
+def parser_version():
+    return "{}-{}".format(
+        getattr(covid_health, "__version__", "0"), PARSER_VERSION
+    )
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def cache_key(name, content: bytes, version=None) -> str:
+    version = parser_version() if version is None else version
+    key = f"{name}:{content_hash(content)}:{version}"
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def cached_frame(name, key, parse) -> pd.DataFrame:
+    """Return the frame stored under `name` and `key`, calling `parse()` and
+    storing its result on a miss.
+
+    Frames are kept as memory-mapped snapshots (see `covid_19_ita.snapshot`)
+    and are backed by read-only memory on hits and misses alike.
+    """
+    frame = snapshot.open_snapshot(name, version=key)
+    if frame is not None:
+        logger.debug(f">>> cache hit: {name} ({key})")
+        return frame
+
+    logger.info(f">>> cache miss: {name} ({key}), parsing.")
+    frame = parse()
+    try:
+        snapshot.write_snapshot(name, frame, version=key)
+    except (ValueError, TypeError) as e:
+        logger.warning(f">>> could not cache {name}: {e}")
+        return frame
+    return snapshot.open_snapshot(name, version=key)
+
+
+def source_version(name, revalidate=True) -> str:
+    """Cache key of DPC source `name` for its current upstream content."""
+    return cache_key(name, fetch(DPC_SOURCES[name], revalidate=revalidate))
+
+
+def dataset_version(name, revalidate=True) -> str:
+    """Key identifying the current content of parsed dataset `name`."""
+    if name in DPC_SOURCES:
+        return source_version(name, revalidate=revalidate)
+    return daily_key(name)
+
+
+def daily_key(name, version=None) -> str:
+    """Key for sources parsed by `covid_health` from urls we do not see:
+    they are parsed again once a day."""
+    version = parser_version() if version is None else version
+    key = f"{name}:{date.today().isoformat()}:{version}"
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def parse_dpc(content: bytes) -> pd.DataFrame:
+    """DPC csv `content` with the column names of `covid_health`."""
+    frame = pd.read_csv(io.BytesIO(content)).rename(columns=DPC_COLUMNS)
+    frame["time"] = pd.to_datetime(frame["time"])
+    return frame
+
+
+def parse_covid_data(name) -> pd.DataFrame:
+    """Cached drop-in for `covid_health.ita.prep_pcm_dpc.parse_covid_data`,
+    parsing the mirrored source (see `covid_19_ita.fetch`)."""
+    content = fetch(DPC_SOURCES[name])
+    return cached_frame(
+        name,
+        cache_key(name, content),
+        lambda: compact(parse_dpc(content), name),
+    )
+
+
+def parse_covid_world_data() -> pd.DataFrame:
+    """Cached drop-in for `covid_health.prep_ecdc.parse_covid_world_data`."""
+    return cached_frame(
+        "ecdc",
+        daily_key("ecdc"),
+        lambda: compact(prep_ecdc.parse_covid_world_data(), "ecdc"),
+    )
+
+
+def parse_covid_tests() -> pd.DataFrame:
+    """Cached drop-in for `covid_health.prep_owid.parse_covid_tests`."""
+    return cached_frame(
+        "owid-tests",
+        daily_key("owid-tests"),
+        lambda: compact(prep_owid.parse_covid_tests(), "owid-tests"),
+    )
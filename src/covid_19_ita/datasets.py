@@ -0,0 +1,106 @@
+"""In-process registry of the datasets shared by figure builders.
+
+Builders are registered by name and memoized in an LRU bounded by a byte
+budget (`COVID19_DATASETS_MAX_BYTES`, 512 MiB by default). `get` hands out
+shallow copies of the memoized frames: with pandas copy-on-write (always on
+since pandas 3) a figure writing into its copy writes into a copy of the
+column, and the arrays it exposes are read-only, so the next figure always
+sees the dataset as built.
+"""
+import logging
+import os
+from collections import OrderedDict
+from functools import wraps
+
+import pandas as pd
+
+from covid_19_ita.schema import frame_nbytes
+
+logger = logging.getLogger("covid_19_ita")
+
+max_bytes = int(os.environ.get("COVID19_DATASETS_MAX_BYTES", 512 * 2 ** 20))
+
+_builders = {}
+_frames = OrderedDict()
+
+
+def _freeze(frame: pd.DataFrame) -> pd.DataFrame:
+    # A shallow copy shares the builder's arrays: copy-on-write keeps the
+    # memoized frame apart from any later write to either.
+    return frame.copy(deep=False)
+
+
+def _evict():
+    total = sum(nbytes for _, nbytes in _frames.values())
+    while total > max_bytes and _frames:
+        name, (_, nbytes) = _frames.popitem(last=False)
+        total -= nbytes
+        logger.debug(f">>> dataset evicted: {name} ({nbytes} bytes)")
+
+
+def register(name, builder):
+    """Register `builder`, a callable with no arguments, under `name`."""
+    _builders[name] = builder
+    _frames.pop(name, None)
+
+
+def builder_of(name):
+    """The builder registered under `name`."""
+    if name not in _builders:
+        raise KeyError(f"unknown dataset '{name}'.")
+    return _builders[name]
+
+
+def dataset(name):
+    """Decorator registering a builder; calls go through `get(name)`."""
+
+    def decorator(builder):
+        register(name, builder)
+
+        @wraps(builder)
+        def wrapper():
+            return get(name)
+
+        wrapper.dataset_name = name
+        return wrapper
+
+    return decorator
+
+
+def get(name) -> pd.DataFrame:
+    """Return a read-only view of dataset `name`, building it on a miss."""
+    if name in _frames:
+        _frames.move_to_end(name)
+        frame, _ = _frames[name]
+        logger.debug(f">>> dataset hit: {name}")
+        return frame.copy(deep=False)
+
+    logger.info(f">>> building dataset: {name}")
+    frame = _freeze(builder_of(name)())
+    nbytes = frame_nbytes(frame)
+    if nbytes <= max_bytes:
+        _frames[name] = (frame, nbytes)
+        _evict()
+    else:
+        logger.warning(
+            f">>> dataset {name} ({nbytes} bytes) exceeds the memory budget "
+            f"({max_bytes} bytes), not memoized."
+        )
+    return frame.copy(deep=False)
+
+
+def set_max_bytes(nbytes: int):
+    global max_bytes
+    max_bytes = int(nbytes)
+    _evict()
+
+
+def clear(name=None):
+    if name is None:
+        _frames.clear()
+    else:
+        _frames.pop(name, None)
+
+
+def names():
+    return sorted(_builders)
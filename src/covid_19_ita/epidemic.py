@@ -0,0 +1,111 @@
+"""Epidemic start and age of countries, regions and provinces.
+
+The start of the epidemic in an entity is the first day a `Threshold` is
+reached: e.g. the 100th case, the 10th death, or 1 case per 100k
+inhabitants. Start dates are computed in one grouped pass and, when a
+dataset version is given, memoized per (version, content, level,
+threshold), so that threshold variants of a figure do not rescan the full
+table. The content is a hash of the columns read, so a frame filtered or
+edited by the caller is never served the start of the dataset.
+"""
+import hashlib
+import logging
+from collections import namedtuple
+
+import pandas as pd
+
+from covid_19_ita import ingest
+
+logger = logging.getLogger("covid_19_ita")
+
+Threshold = namedtuple(
+    "Threshold", ["column", "value", "per", "scale"], defaults=(None, 1)
+)
+Threshold.__doc__ = """`column` (divided by `per` and multiplied by
+`scale` when `per` is set) reaching `value`."""
+
+CASES_100 = Threshold("tot_n_cases", 100)
+DEATHS_10 = Threshold("n_deceased", 10)
+CASES_PER_100K = Threshold("tot_n_cases", 1, per="population", scale=1e5)
+
+AGE_COLUMNS = ["epidemic_start", "epidemic_age"]
+
+_starts = {}
+
+
+def _level(by):
+    if isinstance(by, (list, tuple)):
+        return by[0] if len(by) == 1 else list(by)
+    return by
+
+
+def _content(frame, by, threshold, time_col) -> str:
+    """Hash of the rows of `frame` read to find the starts."""
+    columns = [time_col, threshold.column, threshold.per]
+    columns += by if isinstance(by, list) else [by]
+    columns = [col for col in dict.fromkeys(columns) if col is not None]
+    hashes = ingest.row_hashes(frame, columns)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
+
+def epidemic_start(
+    frame: pd.DataFrame, threshold, by=None, time_col="time", version=None
+):
+    """First `time_col` at which `threshold` is reached, per group `by` (a
+    Series), or overall when `by` is None (a Timestamp, NaT if never).
+
+    Results are memoized when `version`, the key of the current content of
+    `frame` (see `covid_19_ita.cache.dataset_version`), is given, together
+    with a hash of the rows of the columns read.
+    """
+    by = _level(by)
+    if version is not None:
+        content = _content(frame, by, threshold, time_col)
+        key = (version, content, str(by), threshold, time_col)
+        if key in _starts:
+            return _starts[key]
+
+    values = frame[threshold.column]
+    if threshold.per is not None:
+        values = values / frame[threshold.per] * threshold.scale
+    reached = frame.loc[(values >= threshold.value).to_numpy()]
+    if by is None:
+        start = reached[time_col].min()
+    else:
+        start = reached.groupby(by, observed=True)[time_col].min()
+
+    if version is not None:
+        _starts[key] = start
+    return start
+
+
+def epidemic_age(
+    frame: pd.DataFrame, threshold, by=None, time_col="time", version=None
+) -> pd.DataFrame:
+    """``epidemic_start`` and ``epidemic_age`` (days, NaN for entities that
+    never reached `threshold`) of each row of `frame`."""
+    by = _level(by)
+    start = epidemic_start(frame, threshold, by, time_col, version)
+    if by is not None:
+        keys = (
+            pd.MultiIndex.from_frame(frame[by])
+            if isinstance(by, list)
+            else pd.Index(frame[by])
+        )
+        start = start.reindex(keys).to_numpy()
+    ages = pd.DataFrame({"epidemic_start": start}, index=frame.index)
+    ages["epidemic_age"] = (frame[time_col] - ages["epidemic_start"]).dt.days
+    return ages
+
+
+def assign_epidemic_age(
+    frame: pd.DataFrame, threshold, by=None, time_col="time", version=None
+) -> pd.DataFrame:
+    """`frame` with its `AGE_COLUMNS` replaced by those of `threshold`."""
+    return frame.drop(columns=AGE_COLUMNS, errors="ignore").join(
+        epidemic_age(frame, threshold, by, time_col, version)
+    )
+
+
+def clear():
+    _starts.clear()
@@ -0,0 +1,76 @@
+"""Split output of the figures: figure JSON and a thin HTML shell.
+
+`write_split` writes the JSON spec of a figure next to its HTML page. The
+page only holds a shell (``templates/figure.html``) that loads the plotly.js
+bundle shared by the whole site from ``docs/assets/js`` and fetches the
+figure data when the figure scrolls into view, so that pages embedding many
+figures download plotly.js once and each figure only when it is seen.
+`remove_split` deletes that JSON when a figure is written as a single page
+again.
+"""
+import logging
+import os
+from os.path import abspath, dirname, exists, join, relpath, splitext
+
+import plotly.offline
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from covid_19_ita import SITE_DIR
+
+logger = logging.getLogger("covid_19_ita")
+
+TEMPLATE_DIR = join(dirname(abspath(__file__)), "templates")
+ASSETS_JS_DIR = join(SITE_DIR, "assets", "js")
+
+
+def plotlyjs_path() -> str:
+    """Path of the site plotly.js bundle, named after its version."""
+    version = plotly.offline.get_plotlyjs_version()
+    return join(ASSETS_JS_DIR, f"plotly-{version}.min.js")
+
+
+def write_plotlyjs() -> str:
+    """Write the plotly.js bundle of the installed plotly, if missing."""
+    path = plotlyjs_path()
+    if not exists(path):
+        os.makedirs(ASSETS_JS_DIR, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as out:
+            out.write(plotly.offline.get_plotlyjs())
+        os.replace(path + ".tmp", path)
+        logger.info(f">>> plotly.js bundle written: {path}")
+    return path
+
+
+def _url(path, page):
+    return relpath(path, dirname(page)).replace(os.sep, "/")
+
+
+def data_path(path) -> str:
+    """Path of the JSON of the figure whose HTML shell is at `path`."""
+    return splitext(path)[0] + ".json"
+
+
+def write_split(spec: str, path, config=None):
+    """Write figure `spec` (its JSON) next to `path` and the HTML shell
+    loading it at `path`."""
+    json_path = data_path(path)
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=select_autoescape(["html"]),
+    )
+    shell = env.get_template("figure.html").render(
+        plotlyjs=_url(plotlyjs_path(), path),
+        data=_url(json_path, path),
+        config=dict({"responsive": True}, **(config or {})),
+    )
+    for out_path, content in [(json_path, spec), (path, shell)]:
+        with open(out_path + ".tmp", "w", encoding="utf-8") as out:
+            out.write(content)
+        os.replace(out_path + ".tmp", out_path)
+
+
+def remove_split(path):
+    """Remove the JSON written by `write_split` next to `path`, if any."""
+    if exists(data_path(path)):
+        os.remove(data_path(path))
+        logger.info(f">>> removed split figure data: {data_path(path)}")
@@ -0,0 +1,314 @@
+"""Local mirror of the remote sources read by the figures.
+
+`fetch(url)` returns the bytes of `url`, keeping a copy under
+``CACHE_DIR/mirror`` that is revalidated with ETag/Last-Modified instead of
+downloaded again. Files of this repository addressed through
+raw.githubusercontent.com are read straight from disk. With
+``COVID19_OFFLINE=1`` no request is made and only the mirror is used.
+
+Builders declare their remote inputs with `requires`; `prefetch` downloads
+them concurrently at build start and keeps the bytes in memory for `fetch`,
+`check` revalidates the mirror with HEAD requests without downloading.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+from datetime import datetime
+from functools import partial
+from os.path import exists, join
+from time import perf_counter
+from urllib.parse import unquote
+
+import aiohttp
+import pandas as pd
+import requests
+
+from covid_19_ita import CACHE_DIR, PROJECT_DIR
+
+logger = logging.getLogger("covid_19_ita")
+
+MIRROR_DIR = join(CACHE_DIR, "mirror")
+REPO_RAW_URL = "https://raw.githubusercontent.com/buildnn/covid-19-ita/master/"
+TIMEOUT = 60
+PER_HOST = 4
+
+offline = os.environ.get("COVID19_OFFLINE", "") not in ("", "0")
+
+_session = requests.Session()
+_prefetched = {}
+
+
+def local_path(url):
+    """Path of `url` in this repository, None if it is not a repo file."""
+    if not url.startswith(REPO_RAW_URL):
+        return None
+    relpath = unquote(url[len(REPO_RAW_URL):])
+    return join(PROJECT_DIR, *relpath.split("/"))
+
+
+def mirror_paths(url):
+    key = hashlib.sha256(url.encode()).hexdigest()[:16]
+    return join(MIRROR_DIR, key), join(MIRROR_DIR, key + ".json")
+
+
+def load_meta(url) -> dict:
+    body_path, meta_path = mirror_paths(url)
+    if not (exists(body_path) and exists(meta_path)):
+        return {}
+    with open(meta_path, "r") as meta_in:
+        return json.load(meta_in)
+
+
+def _read(path) -> bytes:
+    with open(path, "rb") as file_in:
+        return file_in.read()
+
+
+def _store(url, content: bytes, headers):
+    body_path, meta_path = mirror_paths(url)
+    os.makedirs(MIRROR_DIR, exist_ok=True)
+    meta = {
+        "url": url,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "sha256": hashlib.sha256(content).hexdigest(),
+        "size": len(content),
+        "fetched_at": datetime.utcnow().isoformat(),
+    }
+    for path, data, mode in [
+        (body_path, content, "wb"),
+        (meta_path, json.dumps(meta, indent=1), "w"),
+    ]:
+        with open(path + ".tmp", mode) as out:
+            out.write(data)
+        os.replace(path + ".tmp", path)
+    return meta
+
+
+def conditional_headers(meta: dict) -> dict:
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def retrieve(url, revalidate=True):
+    """Return ``(content, status)`` for `url`.
+
+    `status` is one of ``"local"`` (repo file), ``"hit"`` (mirror used
+    without a request), ``"not-modified"`` (mirror revalidated) and
+    ``"miss"`` (downloaded).
+    """
+    if url in _prefetched:
+        return _prefetched[url]
+
+    path = local_path(url)
+    if path is not None and exists(path):
+        return _read(path), "local"
+
+    body_path, _ = mirror_paths(url)
+    meta = load_meta(url)
+
+    if offline or (meta and not revalidate):
+        if not meta:
+            raise FileNotFoundError(
+                f"{url} is not mirrored in {MIRROR_DIR} and offline mode "
+                "is on."
+            )
+        return _read(body_path), "hit"
+
+    response = _session.get(
+        url, headers=conditional_headers(meta), timeout=TIMEOUT
+    )
+    if response.status_code == 304 and meta:
+        logger.debug(f">>> not modified: {url}")
+        return _read(body_path), "not-modified"
+
+    response.raise_for_status()
+    _store(url, response.content, response.headers)
+    logger.info(f">>> mirrored: {url} ({len(response.content)} bytes)")
+    return response.content, "miss"
+
+
+def fetch(url, revalidate=True) -> bytes:
+    return retrieve(url, revalidate=revalidate)[0]
+
+
+def source_hash(url, revalidate=True) -> str:
+    """sha256 of the current content of `url`, as recorded by the mirror."""
+    content, status = retrieve(url, revalidate=revalidate)
+    meta = {} if status == "local" else load_meta(url)
+    return meta.get("sha256") or hashlib.sha256(content).hexdigest()
+
+
+def read_csv(url, **kwargs) -> pd.DataFrame:
+    """`pd.read_csv` on the mirrored copy of `url`."""
+    return pd.read_csv(io.BytesIO(fetch(url)), **kwargs)
+
+
+# --- PREFETCH ---
+
+
+def requires(*urls):
+    """Decorator declaring the remote sources read by a builder."""
+
+    def decorator(builder):
+        builder.remote_sources = tuple(
+            getattr(builder, "remote_sources", ())
+        ) + tuple(urls)
+        return builder
+
+    return decorator
+
+
+def collect_sources(builders):
+    sources = []
+    for builder in builders:
+        for url in getattr(builder, "remote_sources", ()):
+            if url not in sources:
+                sources.append(url)
+    return sources
+
+
+async def _retrieve_async(session, url, revalidate):
+    body_path, _ = mirror_paths(url)
+    meta = load_meta(url)
+    if meta and not revalidate:
+        return _read(body_path), "hit"
+
+    async with session.get(url, headers=conditional_headers(meta)) as response:
+        if response.status == 304 and meta:
+            return _read(body_path), "not-modified"
+        response.raise_for_status()
+        content = await response.read()
+        _store(url, content, response.headers)
+        return content, "miss"
+
+
+async def _check_async(session, url):
+    meta = load_meta(url)
+    if not meta:
+        return "missing"
+    if not (meta.get("etag") or meta.get("last_modified")):
+        # e.g. Google Sheets exports: only a download would tell.
+        return "unknown"
+
+    async with session.head(
+        url, headers=conditional_headers(meta), allow_redirects=True
+    ) as response:
+        if response.status == 304:
+            return "fresh"
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        modified = response.headers.get("Last-Modified")
+    if not (etag or modified):
+        return "unknown"
+    if (etag and etag == meta.get("etag")) or (
+        modified and modified == meta.get("last_modified")
+    ):
+        return "fresh"
+    return "stale"
+
+
+async def _timed(request):
+    start = perf_counter()
+    result = await request
+    return result, perf_counter() - start
+
+
+async def _gather(requests_, per_host):
+    connector = aiohttp.TCPConnector(limit_per_host=per_host)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=timeout
+    ) as session:
+        return await asyncio.gather(
+            *[_timed(request(session)) for request in requests_],
+            return_exceptions=True,
+        )
+
+
+def prefetch(urls, per_host=PER_HOST, revalidate=True) -> dict:
+    """Download `urls` concurrently.
+
+    Return ``{url: (status, size, seconds)}``, `status` as in `retrieve`.
+    Repo files and, in offline mode, every url are left to `fetch`. A url
+    that fails is reported with its exception and fetched again on use.
+    """
+    remote = [
+        url
+        for url in urls
+        if url not in _prefetched and local_path(url) is None
+    ]
+    statuses = {
+        url: ("local", os.path.getsize(local_path(url)), 0.0)
+        for url in urls
+        if local_path(url) is not None and exists(local_path(url))
+    }
+    if offline or not remote:
+        return statuses
+
+    start = datetime.now()
+    results = asyncio.run(
+        _gather(
+            [
+                partial(_retrieve_async, url=url, revalidate=revalidate)
+                for url in remote
+            ],
+            per_host,
+        )
+    )
+    for url, result in zip(remote, results):
+        if isinstance(result, Exception):
+            logger.warning(f">>> prefetch failed: {url}: {result}")
+            statuses[url] = (result, 0, 0.0)
+        else:
+            (content, status), seconds = result
+            _prefetched[url] = (content, status)
+            statuses[url] = (status, len(content), seconds)
+    logger.info(
+        f">>> prefetched {len(remote)} sources in {datetime.now() - start}."
+    )
+    return statuses
+
+
+def check(urls, per_host=PER_HOST) -> dict:
+    """Revalidate the mirror of `urls` without downloading them.
+
+    Return ``{url: (status, size, seconds)}`` where `status` is one of
+    ``"local"``, ``"fresh"``, ``"stale"``, ``"unknown"`` (mirrored without
+    ETag or Last-Modified to revalidate) and ``"missing"`` (not mirrored),
+    or ``"mirrored"`` in offline mode. `size` is the size of the mirror.
+    """
+    statuses = {}
+    remote = []
+    for url in urls:
+        path = local_path(url)
+        if path is not None and exists(path):
+            statuses[url] = ("local", os.path.getsize(path), 0.0)
+        elif offline:
+            meta = load_meta(url)
+            status = "mirrored" if meta else "missing"
+            statuses[url] = (status, meta.get("size", 0), 0.0)
+        else:
+            remote.append(url)
+
+    results = []
+    if remote:
+        requests_ = [partial(_check_async, url=url) for url in remote]
+        results = asyncio.run(_gather(requests_, per_host))
+    for url, result in zip(remote, results):
+        if isinstance(result, Exception):
+            logger.warning(f">>> check failed: {url}: {result}")
+            result = (result, 0.0)
+        statuses[url] = (result[0], load_meta(url).get("size", 0), result[1])
+    return statuses
+
+
+def clear_prefetched():
+    _prefetched.clear()
@@ -0,0 +1,183 @@
+"""Content-addressed cache of built figures.
+
+`cached_figure` keeps the JSON spec of the figures returned by a builder
+under ``CACHE_DIR/figures``, keyed by the versions of the builder's inputs,
+the source of its module and its arguments. Inputs are the remote sources
+declared with `covid_19_ita.fetch.requires`, versioned by the hash of their
+mirrored content, and the datasets named in the decorator, versioned with
+`dataset_version` together with the code building them. On a hit the figure
+is loaded from its spec, without preparing the data nor assembling it with
+plotly.
+
+The code of a builder is its whole module and every `covid_19_ita` module
+it uses, directly or through other modules, so that edits to the helpers
+it calls also invalidate its figures. ``COVID19_FIGURE_CACHE=0`` disables
+the cache.
+"""
+import glob
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sys
+from functools import lru_cache, wraps
+from os.path import exists, join
+
+import plotly
+import plotly.io as pio
+
+from covid_19_ita import CACHE_DIR, __version__, cache, fetch
+from covid_19_ita.datasets import builder_of
+
+logger = logging.getLogger("covid_19_ita")
+
+FIGURES_DIR = join(CACHE_DIR, "figures")
+PACKAGE = __name__.split(".")[0]
+
+enabled = os.environ.get("COVID19_FIGURE_CACHE", "1") not in ("", "0")
+
+
+def digest(value) -> str:
+    """Short hash of the JSON of `value` (`repr` for other objects)."""
+    text = json.dumps(value, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def _package_module(value):
+    name = value.__name__ if inspect.ismodule(value) else None
+    name = name or getattr(value, "__module__", None)
+    if not isinstance(name, str) or name.split(".")[0] != PACKAGE:
+        return None
+    return sys.modules.get(name)
+
+
+def package_modules(module) -> list:
+    """Names of `module` and of the modules of this package it uses: the
+    modules, functions and classes among its globals, recursively."""
+    names = set()
+    pending = [module]
+    while pending:
+        module = pending.pop()
+        if module is None or module.__name__ in names:
+            continue
+        names.add(module.__name__)
+        pending.extend(map(_package_module, vars(module).values()))
+    return sorted(names)
+
+
+@lru_cache(maxsize=None)
+def _source_digest(module_name) -> str:
+    return digest(inspect.getsource(sys.modules[module_name]))
+
+
+def code_version(builder) -> str:
+    """Hash of the source of the module defining `builder` and of the
+    package modules it uses (see `package_modules`)."""
+    module = inspect.getmodule(builder)
+    try:
+        sources = {
+            name: _source_digest(name) for name in package_modules(module)
+        }
+    except (OSError, TypeError):
+        sources = {builder.__qualname__: digest(inspect.getsource(builder))}
+    return digest([sources, __version__, plotly.__version__])
+
+
+def dataset_version(name) -> str:
+    """Version of dataset `name` and of the code building it.
+
+    Parsed datasets are versioned with `covid_19_ita.cache.dataset_version`,
+    which includes the parser version. Datasets of `covid_19_ita.datasets`
+    with the hashes of the sources their builder declares (or, without any,
+    `cache.dataset_version`) and of the module of the builder, so that
+    changes to the derivation invalidate the figures reading them.
+    """
+    try:
+        builder = builder_of(name)
+    except KeyError:
+        return cache.dataset_version(name)
+    urls = getattr(builder, "remote_sources", ())
+    content = [fetch.source_hash(url) for url in urls]
+    return digest(
+        [content or cache.dataset_version(name), code_version(builder)]
+    )
+
+
+def input_versions(builder, arguments=None) -> dict:
+    """Versions of the remote sources and datasets read by `builder`
+    called with `arguments`."""
+    arguments = {} if arguments is None else arguments
+    versions = {
+        url: fetch.source_hash(url)
+        for url in getattr(builder, "remote_sources", ())
+    }
+    for name in getattr(builder, "datasets", ()):
+        name = arguments.get(name, name)
+        versions[name] = dataset_version(name)
+    return versions
+
+
+def _store(path, spec: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as out:
+        out.write(spec)
+    os.replace(path + ".tmp", path)
+
+
+def cached_figure(*datasets, ignore=()):
+    """Decorator caching the figure returned by a builder.
+
+    `datasets` are the names of the datasets read by the builder besides
+    its `requires` sources, or the names of the arguments giving them.
+    `ignore` are the arguments that do not change the figure (e.g. a
+    preloaded frame of the declared inputs).
+    ``builder.spec(...)`` returns the JSON spec of the figure.
+    """
+
+    def decorator(builder):
+        name = f"{builder.__module__}.{builder.__qualname__}"
+        signature = inspect.signature(builder)
+
+        def spec(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                arg: value
+                for arg, value in bound.arguments.items()
+                if arg not in ignore
+            }
+            args_key = digest(arguments)
+            key = digest(
+                [code_version(builder), input_versions(wrapper, arguments)]
+            )
+            path = join(FIGURES_DIR, name, f"{args_key}-{key}.json")
+
+            if enabled and exists(path):
+                logger.debug(f">>> figure cache hit: {name} ({key})")
+                with open(path, "r") as spec_in:
+                    return spec_in.read()
+
+            logger.info(f">>> figure cache miss: {name} ({key}), building.")
+            figure = builder(*args, **kwargs).to_json()
+            if enabled:
+                pattern = join(FIGURES_DIR, name, f"{args_key}-*.json")
+                for stale in glob.glob(pattern):
+                    os.remove(stale)
+                _store(path, figure)
+            return figure
+
+        @wraps(builder)
+        def wrapper(*args, **kwargs):
+            return pio.from_json(spec(*args, **kwargs))
+
+        wrapper.datasets = tuple(datasets)
+        wrapper.spec = spec
+        return wrapper
+
+    return decorator
+
+
+def clear():
+    for path in glob.glob(join(FIGURES_DIR, "*", "*.json")):
+        os.remove(path)
@@ -1,65 +1,88 @@
 import os
 
 import numpy as np
-import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
-from covid_health.fn.epidemic import calculate_epidemic_age
-from covid_health.ita import prep_pcm_dpc
 from covid_health.utils import map_names
 
 from covid_19_ita import SITE_DIR
+from covid_19_ita.cache import DPC_SOURCES, dataset_version, parse_covid_data
+from covid_19_ita.epidemic import CASES_100, assign_epidemic_age
+from covid_19_ita.fetch import requires
+from covid_19_ita.figcache import cached_figure
+from covid_19_ita.pipeline import LazyFrame
+from covid_19_ita.registry import register
+from covid_19_ita.schema import plain
+from covid_19_ita.utils import (
+    DOUBLING_CURVES,
+    doubling_traces,
+    filter_dropdown,
+)
 
 
 HUE = "province"
 X = "epidemic_age"
 Y = "tot_n_cases"
-PREQUERY = "province != 'In fase di definizione/aggiornamento' " f"& {Y} > 0 & {X} >= 0"
+PREQUERY = (
+    "province != 'In fase di definizione/aggiornamento'",
+    f"{Y} > 0",
+    f"{X} >= 0",
+)
 QUERY = "epidemic_age >= 0"
 TITLE_SLUG = "Crescita dei casi:"
 
 EXPORT_DIR = os.path.join(SITE_DIR, "figures")
 
 
-def build_simulation_trace(simulation, x_values, name, color, real_data, Y, **kwargs):
-    mask = simulation < real_data[Y].max()
-    trace = go.Scatter(
-        dict(
-            x=x_values[mask],
-            y=simulation[mask],
-            line=dict(color=color, width=0.5, dash="dot"),
-            # line=dict(color=color, width=0.5),
-            name=name,
-            mode="lines+markers",
-            # mode="lines",
-            **kwargs,
+def load_source(covid_data_db, hue=HUE, threshold=CASES_100):
+    """Lazy frame of `covid_data_db` with the epidemic age of each `hue`,
+    to be shared by the variants of `make_fig_010001`.
+
+    The age is computed here from `threshold`, replacing any epidemic age
+    columns of the parsed data.
+    """
+    covid_data = parse_covid_data(covid_data_db)
+    return LazyFrame(
+        assign_epidemic_age(
+            covid_data,
+            threshold,
+            by=hue,
+            version=dataset_version(covid_data_db),
         )
     )
-    return trace
 
 
+@cached_figure("covid_data_db", ignore=("source",))
 def make_fig_010001(
-    covid_data_db, X, Y, hue=HUE, subhue="region", query=QUERY, prequery=PREQUERY,
+    covid_data_db,
+    X,
+    Y,
+    hue=HUE,
+    subhue="region",
+    query=QUERY,
+    prequery=PREQUERY,
+    threshold=CASES_100,
+    curves=DOUBLING_CURVES,
+    source=None,
 ):
-
-    covid_data = prep_pcm_dpc.parse_covid_data(covid_data_db)
-    covid_data = covid_data.query(prequery)
-    covid_data = covid_data.sort_values(["time", hue])
-    covid_data = covid_data.query(query)
-
-    covid_data["time"] = covid_data["time"].astype(str)
+    if source is None:
+        source = load_source(covid_data_db, hue=hue, threshold=threshold)
+    covid_data = (
+        source.filter(prequery)
+        .filter(query)
+        .select(["time", X, Y, hue, subhue, "region"])
+        .sort(["time", hue])
+        .collect()
+    )
+    covid_data = covid_data.assign(time=covid_data["time"].astype(str))
 
     # -----------
     if X == "epidemic_age":
-        x_values = np.array(list(range(len(covid_data[X].unique()))))
+        x_values = np.arange(covid_data[X].nunique())
         minx = 0.0
     else:
         x_values = np.sort(covid_data[X].unique())
         minx = covid_data[X].min()
 
-    doub_2w = np.array([int(100 * (2 ** (1 / 14)) ** i) for i in range(len(x_values))])
-    doub_w = np.array([int(100 * (2 ** (1 / 7)) ** i) for i in range(len(x_values))])
-    doub_3d = np.array([int(100 * (2 ** (1 / 3)) ** i) for i in range(len(x_values))])
     if X == "epidemic_age":
         addargs = dict(
             range_x=(0, int(covid_data[X].max()) + 1),
@@ -72,7 +95,7 @@ def make_fig_010001(
         }
         log_y = False
     fig = px.line(
-        map_names(covid_data, language="it"),
+        map_names(plain(covid_data), language="it"),
         x=map_names(X),
         y=map_names(Y),
         color=map_names(subhue),
@@ -88,16 +111,7 @@ def make_fig_010001(
     )
 
     if X == "epidemic_age":
-        fig.add_traces(
-            [
-                build_simulation_trace(simulation, x_values, name, color, covid_data, Y)
-                for simulation, name, color in zip(
-                    [doub_3d, doub_w, doub_2w],
-                    ["2x ogni 3gg", "2x ogni settimana", "2x ogni 2settimane"],
-                    ["#3C1518", "#A44200", "#D58936"],
-                )
-            ]
-        )
+        fig.add_traces(doubling_traces(x_values, covid_data[Y].max(), curves))
 
     # fig = go.Figure()
 
@@ -186,86 +200,22 @@ def make_fig_010001(
     #         ),
     #     ],
     # )
-    traces_region = [trace["name"].split(", ")[0] for trace in fig.select_traces()]
-    if X == "epidemic_age":
-        simulations = traces_region[-3:]
-        traces_region = pd.Series(traces_region[:-3])
-    else:
-        simulations = []
-        traces_region = pd.Series(traces_region)
-
-    but_region = dict(
-        type="dropdown",
+    but_region = filter_dropdown(
+        covid_data,
+        by="region",
+        x_col=X,
+        y_col=Y,
+        trace_groups=[
+            trace["name"].split(", ")[0] for trace in fig.select_traces()
+        ],
+        all_label="Tutte le Regioni",
+        title=lambda label: f"{TITLE_SLUG} {label}".ljust(36),
+        y_floor=100,
         direction="down",
         pad={"r": 10, "t": 10},
         showactive=True,
         x=0.3,
         y=button_layer_1_height,
-        # xanchor="left",
-        # active=0,
-        # y=button_layer_2_height,
-        # yanchor="top",
-        # direction="down",
-        # pad={"r": 10, "t": 10},
-        # showactive=False,
-        # x=0.22,
-        # xanchor="left",
-        # y=1.08,
-        # yanchor="top",
-        buttons=list(
-            [
-                dict(
-                    label="Tutte le Regioni",
-                    method="update",
-                    args=[
-                        {"visible": [True] * (len(traces_region) + len(simulations))},
-                        {
-                            "yaxis": {
-                                "range": (covid_data[Y].min(), covid_data[Y].max(),),
-                            },
-                            "xaxis": {
-                                "range": (covid_data[X].min(), covid_data[X].max(),)
-                            },
-                        },
-                        {"title": f"{TITLE_SLUG} Tutte le Regioni".ljust(36)},
-                    ],
-                ),
-            ]
-            + [
-                dict(
-                    label=region,
-                    method="update",
-                    args=[
-                        {
-                            "visible": [r == region for r in traces_region]
-                            + [True] * len(simulations)
-                        },
-                        {
-                            "yaxis": {
-                                "range": (
-                                    100,
-                                    covid_data.loc[
-                                        covid_data.region == region, Y
-                                    ].max(),
-                                ),
-                            },
-                            "xaxis": {
-                                "range": (
-                                    covid_data.loc[
-                                        covid_data.region == region, X
-                                    ].min(),
-                                    covid_data.loc[
-                                        covid_data.region == region, X
-                                    ].max(),
-                                )
-                            },
-                        },
-                        {"title": "{} {}".format(TITLE_SLUG, region).ljust(36)},
-                    ],
-                )
-                for region in traces_region.unique()
-            ]
-        ),
     )
 
     fig.update_layout(
@@ -339,40 +289,49 @@ def make_fig_010001(
     return fig
 
 
-if __name__ == "__main__":
-    fig = make_fig_010001(
-        "dpc-province", X, Y, hue=HUE, subhue="region", query=QUERY, prequery=PREQUERY,
+@requires(DPC_SOURCES["dpc-province"])
+def fig_010001(source=None):
+    return make_fig_010001(
+        "dpc-province",
+        X,
+        Y,
+        hue=HUE,
+        subhue="region",
+        query=QUERY,
+        prequery=PREQUERY,
+        source=source,
     )
 
-    fig.write_html(
-        os.path.join(EXPORT_DIR, "fig_010001.html"),
-        include_plotlyjs="cdn",
-        config={
-            "scrollZoom": True,
-            "doubleClick": False,
-            "showAxisDragHandles": False,
-            # "displayModeBar": True,
-            "doubleClick": "reset+autosize",
-            "displaylogo": False,
-            # 'hoverCompareCartesian': True,
-        },
-    )
 
-    fig = make_fig_010001(
+@requires(DPC_SOURCES["dpc-province"])
+def fig_010000(source=None):
+    return make_fig_010001(
         "dpc-province",
         "time",
         Y,
         hue=HUE,
         subhue="region",
         query="province != ''",
-        prequery=("province != 'In fase di definizione/aggiornamento' " f"& {Y} > 0"),
+        prequery=PREQUERY[:2],
+        source=source,
     )
 
-    fig.write_html(
-        os.path.join(EXPORT_DIR, "fig_010000.html"),
-        include_plotlyjs="cdn",
-        config={
-            "displaylogo": False,
-            # 'hoverCompareCartesian': True,
-        },
-    )
+
+register(
+    "fig_010001",
+    fig_010001,
+    os.path.join(EXPORT_DIR, "fig_010001.html"),
+    datasets=["dpc-province"],
+    config={
+        "scrollZoom": True,
+        "showAxisDragHandles": False,
+        "doubleClick": "reset+autosize",
+        "displaylogo": False,
+    },
+)
+register(
+    "fig_010000",
+    fig_010000,
+    os.path.join(EXPORT_DIR, "fig_010000.html"),
+    datasets=["dpc-province"],
+)
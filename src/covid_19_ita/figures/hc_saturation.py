@@ -1,19 +1,40 @@
 import os
 import pandas as pd
 import numpy as np
-from covid_health.prep_eurostat import parse_eurostat_dataset
-from covid_health.ita import prep_pcm_dpc, prep_salutegov
+from covid_health.ita import prep_salutegov
 from covid_health.utils import map_names
 
 from covid_19_ita import SITE_DIR
+from covid_19_ita.cache import (
+    DPC_SOURCES,
+    cached_frame,
+    daily_key,
+    parse_covid_data,
+)
+from covid_19_ita.datasets import dataset
+from covid_19_ita.fetch import requires
+from covid_19_ita.registry import register
+from covid_19_ita.schema import plain
 import plotly.express as px
 
 
 EXPORT_DIR = os.path.join(SITE_DIR, "figures")
+HOSPITAL_BEDS = "hospital_beds_by_discipline_hospital"
 
 
-if __name__ == "__main__":
-    hospital_beds = prep_salutegov.parse_dataset("hospital_beds_by_discipline_hospital")
+@dataset("salutegov-hospital-beds")
+def hospital_beds_table():
+    """Hospital beds by discipline, parsed by `covid_health` once a day."""
+    return cached_frame(
+        "salutegov-hospital-beds",
+        daily_key("salutegov-hospital-beds"),
+        lambda: prep_salutegov.parse_dataset(HOSPITAL_BEDS),
+    )
+
+
+@requires(DPC_SOURCES["dpc-regions"])
+def fig_010004():
+    hospital_beds = hospital_beds_table()
     hospital_beds.region_code = hospital_beds.region_code.str[:2]
     hospital_beds = (
         hospital_beds.query("discipline == 'TERAPIA INTENSIVA' & time == '2018'")
@@ -22,7 +43,7 @@ if __name__ == "__main__":
         .agg({"tot_n_hospital_bed": "sum"})
     )
 
-    covid_data_reg = prep_pcm_dpc.parse_covid_data("dpc-regions")
+    covid_data_reg = parse_covid_data("dpc-regions")
     covid_data_reg["region_code"].unique()
     covid_data_reg["intensive_care_beds"] = hospital_beds.reindex(
         covid_data_reg["region_code"].values.astype(int)
@@ -38,7 +59,7 @@ if __name__ == "__main__":
     }
 
     fig = px.bar(
-        map_names(snap),
+        map_names(plain(snap)),
         x=map_names("region"),
         y=map_names("saturazione_TI"),
         color=map_names("saturazione_TI"),
@@ -89,16 +110,18 @@ if __name__ == "__main__":
         ],
     )
 
-    fig.write_html(
-        os.path.join(EXPORT_DIR, "fig_010004.html"),
-        include_plotlyjs="cdn",
-        config={
-            "scrollZoom": True,
-            "doubleClick": False,
-            "showAxisDragHandles": False,
-            # "displayModeBar": True,
-            "doubleClick": "reset+autosize",
-            "displaylogo": False,
-            # 'hoverCompareCartesian': True,
-        },
-    )
+    return fig
+
+
+register(
+    "fig_010004",
+    fig_010004,
+    os.path.join(EXPORT_DIR, "fig_010004.html"),
+    datasets=["dpc-regions", "salutegov-hospital-beds"],
+    config={
+        "scrollZoom": True,
+        "showAxisDragHandles": False,
+        "doubleClick": "reset+autosize",
+        "displaylogo": False,
+    },
+)
@@ -1,12 +1,15 @@
-import warnings
-
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from covid_19_ita import ingest, rollup
+from covid_19_ita.cache import DPC_SOURCES, parse_covid_data, parser_version
+from covid_19_ita.datasets import dataset
+from covid_19_ita.epidemic import CASES_100, Threshold, assign_epidemic_age
+from covid_19_ita.fetch import read_csv, requires
+from covid_19_ita.transforms import decumulate
 from covid_19_ita.utils import watermark
-from covid_health.ita import prep_pcm_dpc
 
 
 tamponi_korea = (
@@ -21,17 +24,6 @@ date_korea = (
 )
 
 
-def decumulate(
-    dataframe: pd.DataFrame, col, newcol, first_val: object = 0
-) -> np.ndarray:
-    series = dataframe[col]
-    result = np.append(
-        [first_val], series.iloc[1:].values - series.iloc[:-1].values
-    )
-    dataframe[newcol] = result
-    return dataframe
-
-
 def bar_line_plot(
     df,
     x="date_report",
@@ -122,71 +114,108 @@ def bar_line_plot(
     return fig
 
 
+# Bump when the derived columns of `prep_dpc_*` change.
+DERIVE_VERSION = "2"
+
+
+def derive_dpc_regions(regioni):
+    regioni = regioni.sort_values(["region", "time"], kind="mergesort")
+    regioni["being_tested"] = decumulate(
+        regioni, ["n_tested"], by="region", negative="clip"
+    )["n_tested"]
+    return regioni.assign(
+        **decumulate(
+            regioni,
+            {
+                "n_deceased": "new_deceased",
+                "n_discharged_recovered": "new_discharged",
+            },
+            by="region",
+        )
+    )
+
+
+@dataset("dpc-regions-prep")
+@requires(DPC_SOURCES["dpc-regions"])
 def prep_dpc_regions():
-    regioni = prep_pcm_dpc.parse_covid_data("dpc-regions")
-    regioni.time = regioni.time.dt.floor("d")
+    regioni = parse_covid_data("dpc-regions")
     regioni["active"] = (
         regioni["tot_n_cases"]
         - regioni["n_discharged_recovered"]
         - regioni["n_deceased"]
     )
     regioni = regioni[~regioni.region.str.startswith("In fase di")]
-    regioni["region"] = regioni["region"].str.strip()
+    regioni["region"] = regioni["region"].str.strip().astype("category")
+
+    return ingest.update(
+        "dpc-regions",
+        regioni,
+        keys=["region"],
+        derive=derive_dpc_regions,
+        version=f"{parser_version()}-{DERIVE_VERSION}",
+    )
 
-    ssets = []
-    with warnings.catch_warnings(record=True):
-        for ix, sset in regioni.groupby("region"):
-            sset["being_tested"] = np.append(
-                [0], sset["n_tested"].values[1:] - sset["n_tested"].values[:-1]
-            )
-            sset.loc[sset["being_tested"].values < 0, "being_tested"] = 0
-            sset = decumulate(sset, "n_deceased", "new_deceased")
-            sset = decumulate(sset, "n_discharged_recovered", "new_discharged")
-            ssets.append(sset.sort_values("time"))
-    regioni = pd.concat(ssets)
-    return regioni
+
+def derive_dpc_province(province):
+    return province.assign(
+        **decumulate(
+            province, {"tot_n_cases": "new_cases"}, by="province_code"
+        )
+    )
 
 
+@dataset("dpc-province-prep")
+@requires(DPC_SOURCES["dpc-province"])
+def prep_dpc_province():
+    province = parse_covid_data("dpc-province")
+
+    return ingest.update(
+        "dpc-province",
+        province,
+        keys=["province_code"],
+        derive=derive_dpc_province,
+        version=f"{parser_version()}-{DERIVE_VERSION}",
+    )
+
+
+@dataset("dpc-rollup")
+@requires(DPC_SOURCES["dpc-regions"])
+def prep_dpc_rollup():
+    # Only the Italy sums are read: provinces are left out of the cube.
+    return rollup.update_cube(
+        "dpc-rollup",
+        {"region": prep_dpc_regions()},
+        version=f"{parser_version()}-{DERIVE_VERSION}",
+    )
+
+
+@requires(DPC_SOURCES["dpc-regions"])
 def prep_dpc_ita():
-    ita_df = (
-        prep_dpc_regions()
-        .groupby("time", as_index=False)[
-            [
-                "n_hospitalized",
-                "n_intensive_care",
-                "tot_n_hospitalized",
-                "n_home_quarantine",
-                "totale_positivi",
-                "variazione_totale_positivi",
-                "nuovi_positivi",
-                "n_discharged_recovered",
-                "n_deceased",
-                "tot_n_cases",
-                "n_tested",
-                "being_tested",
-            ]
-        ]
-        .sum()
+    ita_df = rollup.select(prep_dpc_rollup(), "italy").drop(columns="code")
+    ita_df = ita_df.assign(
+        **decumulate(
+            ita_df,
+            {
+                "n_deceased": "new_deceased",
+                "n_discharged_recovered": "new_discharged",
+            },
+        )
     )
-    ita_df = decumulate(ita_df, "n_deceased", "new_deceased")
-    ita_df = decumulate(ita_df, "n_discharged_recovered", "new_discharged")
     ita_df["active"] = (
         ita_df["tot_n_cases"]
         - ita_df["n_discharged_recovered"]
         - ita_df["n_deceased"]
     )
-    ita_df["epidemic_start"] = ita_df[ita_df.tot_n_cases >= 100].time.min()
-    ita_df["epidemic_age"] = (
-        ita_df["time"] - ita_df["epidemic_start"]
-    ).dt.days
+    ita_df = assign_epidemic_age(ita_df, CASES_100)
     ita_df["second_disch_totest"] = np.append(
         [0] * 14, ita_df["new_discharged"].iloc[:-14]
     )
     return ita_df
 
 
+@requires(tamponi_korea)
 def prep_korea():
-    korea_df = pd.read_csv(tamponi_korea).iloc[:, :-2]
+    korea_df = read_csv(tamponi_korea).iloc[:, :-2]
     korea_df = korea_df.replace({"": np.nan})
     korea_df = korea_df.astype(
         {
@@ -211,16 +240,20 @@ def prep_korea():
     korea_df["active"] = (
         korea_df["positive"] - korea_df["death"] - korea_df["discharged"]
     )
-    korea_df["epidemic_start"] = korea_df[korea_df.positive >= 100][
-        "date_report"
-    ].min()
-    korea_df["epidemic_age"] = (
-        korea_df["date_report"] - korea_df["epidemic_start"]
-    ).dt.days
+    korea_df = assign_epidemic_age(
+        korea_df, Threshold("positive", 100), time_col="date_report"
+    )
     korea_df = korea_df.sort_values("date_report", ascending=True)
-    korea_df = decumulate(korea_df, "positive", "new_positives")
-    korea_df = decumulate(korea_df, "death", "new_deaths")
-    korea_df = decumulate(korea_df, "discharged", "new_discharged")
+    korea_df = korea_df.join(
+        decumulate(
+            korea_df,
+            {
+                "positive": "new_positives",
+                "death": "new_deaths",
+                "discharged": "new_discharged",
+            },
+        )
+    )
     korea_df["second_disch_totest"] = np.append(
         [0] * 14, korea_df["new_discharged"].iloc[:-14]
     )
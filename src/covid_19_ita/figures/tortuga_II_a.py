@@ -1,6 +1,4 @@
 from os.path import join
-import pandas as pd
-import numpy as np
 
 # import geopandas as gpd
 from covid_health.ita import prep_salutegov
@@ -8,8 +6,12 @@ from covid_health.ita import prep_salutegov
 # from covid_health.ita import prep_istat
 from covid_health import prep_eurostat
 
+from covid_19_ita.fetch import read_csv, requires
+from covid_19_ita.figcache import cached_figure
+from covid_19_ita.registry import register
+from covid_19_ita.schema import compact, plain, relabel
 from covid_19_ita.utils import watermark
-from covid_19_ita import SITE_DIR
+from covid_19_ita import SITE_DIR, geo
 import plotly.express as px
 
 # import plotly.graph_objects as go
@@ -22,6 +24,15 @@ GDF_REG = (
     "https://raw.githubusercontent.com/openpolis/geojson-italy/"
     "master/geojson/limits_IT_regions.geojson"
 )
+LEA_SHEET = (
+    "https://docs.google.com/spreadsheets/d/e/"
+    "2PACX-1vRNSiOhlGO4r2Dh2cSr2zJbQ-iUfqqbQojs"
+    "aTe4z1omzhuIjI_fzJCoD3EFNzgCeXMeX-3cVsZK1hZS/pub?output=csv"
+)
+MIGRAZIONE_SANITARIA = (
+    "https://raw.githubusercontent.com/buildnn/covid-19-ita/master/"
+    "data/migrazione_sanitaria_gimbe_2019-06.csv"
+)
 
 
 def get_es_maps():
@@ -37,12 +48,15 @@ def get_es_maps():
     return es_unit_value_map, es_geo_value_map
 
 
+@cached_figure("hlth_rs_bdsrg")
 def fig_a001():
 
     es_unit_value_map, es_geo_value_map = get_es_maps()
     es_facility_value_map = dict(prep_eurostat.var["eurostat"]["facility"])
 
-    hlth_rs_bdsrg = prep_eurostat.parse_eurostat_dataset("hlth_rs_bdsrg")
+    hlth_rs_bdsrg = compact(
+        prep_eurostat.parse_eurostat_dataset("hlth_rs_bdsrg"), "hlth_rs_bdsrg"
+    )
     hlth_rs_bdsrg = hlth_rs_bdsrg.query("unit == 'P_HTHAB'").drop(
         columns=["unit"]
     )
@@ -57,10 +71,10 @@ def fig_a001():
 
     with warnings.catch_warnings(record=True):
         hsp_beds["time"] = hsp_beds["time"].dt.year
-        hsp_beds["facility"] = hsp_beds["facility"].replace(
-            es_facility_value_map
+        hsp_beds["facility"] = relabel(
+            hsp_beds["facility"], es_facility_value_map
         )
-        hsp_beds["Regione"] = hsp_beds["geo"].replace(es_geo_value_map)
+        hsp_beds["Regione"] = relabel(hsp_beds["geo"], es_geo_value_map)
 
     # --- CHARTS ---
     subset = hsp_beds.query("time == 2001 | time == 2017")
@@ -71,7 +85,7 @@ def fig_a001():
     subset = subset.sort_values(by=["time", "level"])
 
     fig_a001 = px.bar(
-        subset,
+        plain(subset),
         x="Regione",
         y="value",
         hover_data=["geo"],
@@ -124,6 +138,8 @@ def fig_a001():
     return fig_a001
 
 
+@cached_figure("pharmacies", "geo-population")
+@requires(geo.ELENCO_COMUNI)
 def fig_a002():
 
     # -- PHARMA
@@ -134,32 +150,11 @@ def fig_a002():
         .reset_index()
         .rename(columns={"pharmacy_code": "n_pharmacies"})
     )
-    asl = (
-        prep_salutegov.parse_dataset("asl_comuni_pop")
-        .replace("", np.nan)
-        .dropna(subset=["region_code"])
-    )
-    asl["TOTALE"] = (
-        asl["TOTALE"]
-        .str.replace(".", "")
-        .str.replace(",", ".")
-        .replace("", np.nan)
-        .astype(float)
-    )
-    pop = asl.groupby(["region_code"]).agg(
-        population=pd.NamedAgg("TOTALE", "sum"),
-        region=pd.NamedAgg("region", "first"),
-    )
-
-    pharma["population"] = pop.reindex(pharma["region_code"].values)[
-        "population"
-    ].values
-    pharma["region"] = (
-        pop.reindex(pharma["region_code"].values)["region"].str.title().values
+    codes = pharma["region_code"].astype(int).to_numpy()
+    pharma["population"] = (
+        geo.population("region", geo.ASL_POP_YEAR).reindex(codes).to_numpy()
     )
-    pharma.loc[
-        pharma.region_code == "04", "region"
-    ] = "Trentino-Alto Adige/Südtirol"
+    pharma["region"] = geo.names("region").reindex(codes).to_numpy()
     pharma["hab_per_pharma"] = (
         (pharma["population"] / pharma["n_pharmacies"]).round(0).astype(int)
     )
@@ -219,12 +214,15 @@ def fig_a002():
     return fig_a002
 
 
+@cached_figure("hlth_rs_prsrg")
 def fig_a003():
 
     es_unit_value_map, es_geo_value_map = get_es_maps()
     es_isco08_value_map = dict(prep_eurostat.var["eurostat"]["isco08"])
 
-    hlth_rs_prsrg = prep_eurostat.parse_eurostat_dataset("hlth_rs_prsrg")
+    hlth_rs_prsrg = compact(
+        prep_eurostat.parse_eurostat_dataset("hlth_rs_prsrg"), "hlth_rs_prsrg"
+    )
     hlth_rs_prsrg = hlth_rs_prsrg.query("unit == 'P_HTHAB'").drop(
         columns=["unit"]
     )
@@ -240,8 +238,8 @@ def fig_a003():
     with warnings.catch_warnings(record=True):
 
         hsp_pers["time"] = hsp_pers["time"].dt.year
-        hsp_pers["isco08"] = hsp_pers["isco08"].replace(es_isco08_value_map)
-        hsp_pers["Regione"] = hsp_pers["geo"].replace(es_geo_value_map)
+        hsp_pers["isco08"] = relabel(hsp_pers["isco08"], es_isco08_value_map)
+        hsp_pers["Regione"] = relabel(hsp_pers["geo"], es_geo_value_map)
 
     # --- CHARTS ---
     field = "isco08"
@@ -258,7 +256,7 @@ def fig_a003():
     subset = subset.sort_values(by=["time", "level"])
 
     fig_a003 = px.bar(
-        subset,
+        plain(subset),
         x="Regione",
         y=cls,
         hover_data=["geo"],
@@ -312,12 +310,15 @@ def fig_a003():
     return fig_a003
 
 
+@cached_figure("hlth_rs_prsrg")
 def fig_a004():
 
     es_unit_value_map, es_geo_value_map = get_es_maps()
     es_isco08_value_map = dict(prep_eurostat.var["eurostat"]["isco08"])
 
-    hlth_rs_prsrg = prep_eurostat.parse_eurostat_dataset("hlth_rs_prsrg")
+    hlth_rs_prsrg = compact(
+        prep_eurostat.parse_eurostat_dataset("hlth_rs_prsrg"), "hlth_rs_prsrg"
+    )
     hlth_rs_prsrg = hlth_rs_prsrg.query("unit == 'P_HTHAB'").drop(
         columns=["unit"]
     )
@@ -333,8 +334,8 @@ def fig_a004():
     with warnings.catch_warnings(record=True):
 
         hsp_pers["time"] = hsp_pers["time"].dt.year
-        hsp_pers["isco08"] = hsp_pers["isco08"].replace(es_isco08_value_map)
-        hsp_pers["Regione"] = hsp_pers["geo"].replace(es_geo_value_map)
+        hsp_pers["isco08"] = relabel(hsp_pers["isco08"], es_isco08_value_map)
+        hsp_pers["Regione"] = relabel(hsp_pers["geo"], es_geo_value_map)
 
     # --- CHARTS ---
     field = "isco08"
@@ -351,7 +352,7 @@ def fig_a004():
     subset = subset.sort_values(by=["time", "level"])
 
     fig_a004 = px.bar(
-        subset,
+        plain(subset),
         x="Regione",
         y=cls,
         hover_data=["geo"],
@@ -405,12 +406,10 @@ def fig_a004():
     return fig_a004
 
 
+@cached_figure()
+@requires(LEA_SHEET)
 def fig_a005():
-    medici_df = pd.read_csv(
-        "https://docs.google.com/spreadsheets/d/e/"
-        "2PACX-1vRNSiOhlGO4r2Dh2cSr2zJbQ-iUfqqbQojs"
-        "aTe4z1omzhuIjI_fzJCoD3EFNzgCeXMeX-3cVsZK1hZS/pub?output=csv"
-    )
+    medici_df = read_csv(LEA_SHEET)
     medici_df = medici_df.query("Anno == 2017")
     medici_df = medici_df.dropna(subset=["Regione"])
     medici_df = medici_df.replace("Emilia_Romagna", "Emilia-Romagna")
@@ -497,11 +496,10 @@ def fig_a005():
     return fig_a005
 
 
+@cached_figure()
+@requires(MIGRAZIONE_SANITARIA)
 def fig_a006():
-    df = pd.read_csv(
-        "https://raw.githubusercontent.com/buildnn/covid-19-ita/master/"
-        "data/migrazione_sanitaria_gimbe_2019-06.csv"
-    )
+    df = read_csv(MIGRAZIONE_SANITARIA)
     df["Saldo"] = ((df["Crediti"] - df["Debiti"]) / 1000000).round(1)
     df = df.sort_values("Saldo").dropna(subset=["Saldo"])
 
@@ -548,40 +546,14 @@ def fig_a006():
     return fig_a006
 
 
-if __name__ == "__main__":
-
-    fig_a001().write_html(
-        join(TARGET_DIR, "fig_a001.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-
-    fig_a002().write_html(
-        join(TARGET_DIR, "fig_a002.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-
-    fig_a003().write_html(
-        join(TARGET_DIR, "fig_a003.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-
-    fig_a004().write_html(
-        join(TARGET_DIR, "fig_a004.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-
-    fig_a005().write_html(
-        join(TARGET_DIR, "fig_a005.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-
-    fig_a006().write_html(
-        join(TARGET_DIR, "fig_a006.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
+register("tortuga/II/fig_a001", fig_a001, join(TARGET_DIR, "fig_a001.html"))
+register(
+    "tortuga/II/fig_a002",
+    fig_a002,
+    join(TARGET_DIR, "fig_a002.html"),
+    datasets=["geo-comuni", "geo-population"],
+)
+register("tortuga/II/fig_a003", fig_a003, join(TARGET_DIR, "fig_a003.html"))
+register("tortuga/II/fig_a004", fig_a004, join(TARGET_DIR, "fig_a004.html"))
+register("tortuga/II/fig_a005", fig_a005, join(TARGET_DIR, "fig_a005.html"))
+register("tortuga/II/fig_a006", fig_a006, join(TARGET_DIR, "fig_a006.html"))
@@ -1,8 +1,13 @@
 from os.path import join
 import pandas as pd
 
-from covid_health.ita.prep_pcm_dpc import parse_covid_data as dpc
-
+from covid_19_ita.cache import DPC_SOURCES, parse_covid_data as dpc
+from covid_19_ita.datasets import dataset
+from covid_19_ita.fetch import read_csv, requires
+from covid_19_ita.figcache import cached_figure
+from covid_19_ita.registry import register
+from covid_19_ita.schema import plain
+from covid_19_ita.transforms import anchor
 from covid_19_ita.utils import watermark
 from covid_19_ita import SITE_DIR
 from covid_19_ita.figures.tortuga import (
@@ -11,54 +16,49 @@ from covid_19_ita.figures.tortuga import (
 )
 import plotly.express as px
 import plotly.graph_objects as go
-import warnings
 
 
 # TARGET_DIR = "tmp"
 TARGET_DIR = join(SITE_DIR, "figures", "tortuga", "II")
 
+ANCHOR_DATE = "2020-02-25"
+ANCHORED_COLUMNS = [
+    "n_hospitalized",
+    "n_intensive_care",
+    "tot_n_hospitalized",
+    "n_home_quarantine",
+    "totale_positivi",
+    "variazione_totale_positivi",
+    "nuovi_positivi",
+    "n_discharged_recovered",
+    "n_deceased",
+    "tot_n_cases",
+    "n_tested",
+]
+
+FSN_SHEET = (
+    "https://docs.google.com/spreadsheets/d/"
+    "1VwmTC47fQdnuVFizvI7eTs3xPPFtJwU4/export?format=csv&"
+    "id=1VwmTC47fQdnuVFizvI7eTs3xPPFtJwU4&gid=831947660"
+)
+
 
+@dataset("dpc-veneto-lombardy")
+@requires(DPC_SOURCES["dpc-regions"])
 def get_veneto_lombardy_df():
     regions = dpc("dpc-regions")
     regions = regions[regions.region.isin(["Lombardia", "Veneto"])]
-    regions.time = regions.time.dt.floor("d")
-    regions
-
-    with warnings.catch_warnings(record=True):
-        regions = pd.concat(list(dateanchored(regions)))
-
-    regions.sort_values(by="time")
-
+    regions = regions.join(
+        anchor(regions, ANCHORED_COLUMNS, ANCHOR_DATE, by="region")
+    )
     return regions
 
 
-def dateanchored(df, by="region", anchor_date="2020-02-25"):
-    for ix, group in df.groupby(by=by):
-        for col in [
-            "n_hospitalized",
-            "n_intensive_care",
-            "tot_n_hospitalized",
-            "n_home_quarantine",
-            "totale_positivi",
-            "variazione_totale_positivi",
-            "nuovi_positivi",
-            "n_discharged_recovered",
-            "n_deceased",
-            "tot_n_cases",
-            "n_tested",
-        ]:
-            anchor = group.loc[group.time == anchor_date, col].iloc[0]
-            if anchor != 0:
-                group[col + "_anchored"] = group[col] / anchor
-
-        yield group
-
-
 def plot_veneto_lombardy(df, y, title):
     x = "time"
 
     fig = px.line(
-        df.round(2),
+        plain(df).round(2),
         x=x,
         y=y,
         color="region",
@@ -73,7 +73,7 @@ def plot_veneto_lombardy(df, y, title):
             "region": "Regione",
         },
         range_x=(
-            pd.to_datetime("2020-02-25"),
+            pd.to_datetime(ANCHOR_DATE),
             df.time.max() + pd.to_timedelta(10, "D"),
         ),
         line_shape="spline",
@@ -120,6 +120,8 @@ def plot_veneto_lombardy(df, y, title):
     return fig
 
 
+@cached_figure()
+@requires(DPC_SOURCES["dpc-regions"])
 def fig_b001():
     fig = plot_veneto_lombardy(
         get_veneto_lombardy_df(),
@@ -133,6 +135,8 @@ def fig_b001():
     return fig
 
 
+@cached_figure()
+@requires(DPC_SOURCES["dpc-regions"])
 def fig_b002():
     fig = plot_veneto_lombardy(
         get_veneto_lombardy_df(),
@@ -146,6 +150,8 @@ def fig_b002():
     return fig
 
 
+@cached_figure()
+@requires(DPC_SOURCES["dpc-regions"])
 def fig_b003():
     fig = plot_veneto_lombardy(
         get_veneto_lombardy_df(),
@@ -159,12 +165,10 @@ def fig_b003():
     return fig
 
 
+@cached_figure()
+@requires(FSN_SHEET)
 def fig_b004():
-    df = pd.read_csv(
-        "https://docs.google.com/spreadsheets/d/"
-        "1VwmTC47fQdnuVFizvI7eTs3xPPFtJwU4/export?format=csv&"
-        "id=1VwmTC47fQdnuVFizvI7eTs3xPPFtJwU4&gid=831947660"
-    )
+    df = read_csv(FSN_SHEET)
 
     fig = go.Figure()
 
@@ -237,27 +241,22 @@ def fig_b004():
     return fig
 
 
-if __name__ == "__main__":
-
-    fig_b001().write_html(
-        join(TARGET_DIR, f"fig_b001.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-    fig_b002().write_html(
-        join(TARGET_DIR, "fig_b002.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-    fig_b003().write_html(
-        join(TARGET_DIR, "fig_b003.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-
-    fig_b004().write_html(
-        join(TARGET_DIR, "fig_b004.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-
+register(
+    "tortuga/II/fig_b001",
+    fig_b001,
+    join(TARGET_DIR, "fig_b001.html"),
+    datasets=["dpc-veneto-lombardy"],
+)
+register(
+    "tortuga/II/fig_b002",
+    fig_b002,
+    join(TARGET_DIR, "fig_b002.html"),
+    datasets=["dpc-veneto-lombardy"],
+)
+register(
+    "tortuga/II/fig_b003",
+    fig_b003,
+    join(TARGET_DIR, "fig_b003.html"),
+    datasets=["dpc-veneto-lombardy"],
+)
+register("tortuga/II/fig_b004", fig_b004, join(TARGET_DIR, "fig_b004.html"))
@@ -1,15 +1,23 @@
+from functools import partial
 from os.path import join
 
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-from covid_19_ita import SITE_DIR
+from covid_19_ita import SITE_DIR, geo
+from covid_19_ita.cache import DPC_SOURCES, parse_covid_data
+from covid_19_ita.datasets import dataset
+from covid_19_ita.fetch import requires
+from covid_19_ita.figcache import cached_figure, dataset_version, digest
+from covid_19_ita.kpi import with_kpis
+from covid_19_ita.registry import register
+from covid_19_ita.schema import plain
 from covid_19_ita.utils import watermark
-from covid_health.ita import prep_istat, prep_pcm_dpc
 from covid_health.utils import map_names
 
 TARGET_DIR = join(SITE_DIR, "figures", "tortuga", "II")
+SOURCES = [DPC_SOURCES["dpc-regions"], geo.ELENCO_COMUNI]
 
 
 labels = {
@@ -31,75 +39,38 @@ labels = {
 }
 
 
+@dataset("dpc-regions-pop")
+@requires(*SOURCES)
 def get_pop_covid_regions():
-    # Popolazione
-    prov = prep_istat.parse_istat_geodemo(
-        "2019_pop_provinces"
-    )  # restituisce la popolazione per provincia
-    prov["province_code"] = prov["province_code"].astype(
-        int
-    )  # convertiamo il codice provincia in numero
-
-    protez_civile = prep_pcm_dpc.parse_covid_data("dpc-province")  # Province
-    protez_civile = protez_civile[
-        ["region_code", "region", "province_code", "province"]
-    ]
-    protez_civile["province_code"] = protez_civile["province_code"].astype(
-        int
-    )  # convertiamo il codice provincia in numero
-    protez_civile = protez_civile.drop_duplicates(["province_code"])
-    protez_civile = protez_civile.set_index("province_code")
-
-    prov["region_code"] = (
-        protez_civile["region_code"].reindex(prov.province_code.values).values
+    covid_data = parse_covid_data("dpc-regions")
+    covid_data["population"] = (
+        geo.population("dpc_region", 2019)
+        .reindex(covid_data["region_code"].to_numpy())
+        .to_numpy()
     )
-    prov = prov.groupby("region_code")["population"].sum()
-    covid_data = prep_pcm_dpc.parse_covid_data("dpc-regions")
-    covid_data["population"] = prov.reindex(
-        covid_data["region_code"].values
-    ).values
-
-    #  Creation of cross DB KPIs
-    covid_data["test_pthab"] = (
-        covid_data.n_tested / (covid_data.population / 1000)
-    ).round(2)
-    covid_data["test_pdisch"] = (
-        covid_data.n_tested / covid_data.n_discharged_recovered
-    ).round(2)
-    covid_data["test_picu"] = (
-        covid_data.n_tested / covid_data.n_intensive_care
-    ).round(2)
-    covid_data["test_pdec"] = (
-        covid_data.n_tested / covid_data.n_deceased
-    ).round(2)
-    covid_data["test_phosp"] = (
-        covid_data.n_tested / covid_data.n_hospitalized
-    ).round(2)
-    covid_data["mortality"] = (
-        covid_data.n_deceased / covid_data.tot_n_cases
-    ).round(2)
-    covid_data["deaths_pthab"] = (
-        covid_data.n_deceased / (covid_data.population / 1000)
-    ).round(2)
-    covid_data["deaths_phhab"] = (
-        covid_data.n_deceased / (covid_data.population / 10000)
-    ).round(2)
-    covid_data["pos_pthab"] = (
-        (covid_data.totale_positivi / covid_data.population) * 1000
-    ).round(2)
-
-    covid_data["time"] = covid_data["time"].dt.floor("D")
 
     return covid_data
 
 
+@cached_figure("geo-population")
+@requires(*SOURCES)
 def fig_c001(y="test_pthab", regions=["Lombardia", "Veneto"]):
-    data = get_pop_covid_regions()
+    data = with_kpis(
+        get_pop_covid_regions(),
+        [y],
+        dataset="dpc-regions-pop",
+        version=digest(
+            [
+                dataset_version("dpc-regions-pop"),
+                dataset_version("geo-population"),
+            ]
+        ),
+    )
     covid_lomb_ven = data[data.region.isin(regions)]
-    ita_mean = data.groupby("time", as_index=False).mean()
+    ita_mean = data[["time", y]].groupby("time", as_index=False).mean()
 
     fig = px.line(
-        map_names(covid_lomb_ven),
+        map_names(plain(covid_lomb_ven)),
         x=map_names("time"),
         y=map_names(y),
         color=map_names("region"),
@@ -173,6 +144,8 @@ def fig_c001(y="test_pthab", regions=["Lombardia", "Veneto"]):
     return fig
 
 
+@cached_figure("geo-population")
+@requires(*SOURCES)
 def fig_c002(regions=["Lombardia", "Veneto"], norm="fraction"):
     value_name = "Valore % sul Tot." if norm == "fraction" else "Valore"
     yformat = ".1%" if norm == "fraction" else ".0"
@@ -188,7 +161,9 @@ def fig_c002(regions=["Lombardia", "Veneto"], norm="fraction"):
     covid_lomb_ven["Variabile"] = covid_lomb_ven["Variabile"].replace(labels)
 
     fig = px.area(
-        covid_lomb_ven.sort_values(by=["time", "Variabile"], ascending=False),
+        plain(covid_lomb_ven).sort_values(
+            by=["time", "Variabile"], ascending=False
+        ),
         x="time",
         y=value_name,
         color="Variabile",
@@ -229,24 +204,27 @@ def fig_c002(regions=["Lombardia", "Veneto"], norm="fraction"):
     return fig
 
 
-if __name__ == "__main__":
-    fig_c001().write_html(
-        join(TARGET_DIR, "fig_c001.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-    fig_c002(norm=None).write_html(
-        join(TARGET_DIR, "fig_c002.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-    fig_c002().write_html(
-        join(TARGET_DIR, "fig_c002_norm.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-    fig_c001(y="pos_pthab").write_html(
-        join(TARGET_DIR, "fig_c004.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
\ No newline at end of file
+register(
+    "tortuga/II/fig_c001",
+    fig_c001,
+    join(TARGET_DIR, "fig_c001.html"),
+    datasets=["dpc-regions-pop"],
+)
+register(
+    "tortuga/II/fig_c002",
+    partial(fig_c002, norm=None),
+    join(TARGET_DIR, "fig_c002.html"),
+    datasets=["dpc-regions-pop"],
+)
+register(
+    "tortuga/II/fig_c002_norm",
+    fig_c002,
+    join(TARGET_DIR, "fig_c002_norm.html"),
+    datasets=["dpc-regions-pop"],
+)
+register(
+    "tortuga/II/fig_c004",
+    partial(fig_c001, y="pos_pthab"),
+    join(TARGET_DIR, "fig_c004.html"),
+    datasets=["dpc-regions-pop"],
+)
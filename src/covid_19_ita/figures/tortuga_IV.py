@@ -1,8 +1,13 @@
+import numpy as np
 import pandas as pd
-from covid_health.prep_ecdc import parse_covid_world_data as pecdc
-from covid_health.prep_owid import parse_covid_tests as ptests
-from covid_health.fn.epidemic import calculate_epidemic_age
-from covid_19_ita.utils import watermark
+from covid_19_ita.budget import load_budget
+from covid_19_ita.cache import dataset_version
+from covid_19_ita.cache import parse_covid_tests as ptests
+from covid_19_ita.cache import parse_covid_world_data as pecdc
+from covid_19_ita.epidemic import Threshold
+from covid_19_ita.epidemic import epidemic_start as get_epidemic_start
+from covid_19_ita.schema import plain, relabel
+from covid_19_ita.utils import doubling_traces, watermark
 
 from plotly.subplots import make_subplots
 import plotly.express as px
@@ -10,6 +15,8 @@ import plotly.graph_objects as go
 
 pd.options.display.max_rows = 6
 
+US_NAME = {"United_States_of_America": "United States"}
+
 programmi = [
     "Coordinamento generale in materia di tutela della "
     "salute, innovazione e politiche internazionali",
@@ -29,7 +36,6 @@ p2 = [
 def get_covid_datasets():
     # ECDC covid data
     covid = pecdc()
-    covid = covid.replace("United_States_of_America", "United States")
     # |   | time       | active_cases | n_deceased | geo         | geo_id | country_code |  population |
     # |--:|:-----------|-------------:|-----------:|:------------|:-------|:-------------|------------:|
     # | 0 | 2020-04-08 |           30 |          4 | Afghanistan | AF     | AFG          | 3.71724e+07 |
@@ -38,10 +44,17 @@ def get_covid_datasets():
     # | 3 | 2020-04-05 |           35 |          1 | Afghanistan | AF     | AFG          | 3.71724e+07 |
     # | 4 | 2020-04-04 |            0 |          0 | Afghanistan | AF     | AFG          | 3.71724e+07 |
 
-    epidemic_start = (
-        covid.loc[covid.active_cases >= 100].groupby("geo").time.min()
+    epidemic_start = get_epidemic_start(
+        covid,
+        Threshold("active_cases", 100),
+        by="geo",
+        version=dataset_version("ecdc"),
+    )
+    covid = covid.assign(geo=relabel(covid["geo"], US_NAME))
+    epidemic_start = epidemic_start.rename(index=US_NAME)
+    epidemic_start = epidemic_start.set_axis(
+        epidemic_start.index.str.replace("_", " ")
     )
-    epidemic_start.index = epidemic_start.index.str.replace("_", " ")
     # geo
     # Algeria                2020-03-29
     # Argentina              2020-03-26
@@ -53,10 +66,12 @@ def get_covid_datasets():
     # Name: time, Length: 65, dtype: datetime64[ns]
 
     tests = ptests()
-    tests = tests.groupby(["time", "geo"], as_index=False).agg("mean")
+    tests = tests.groupby(["time", "geo"], as_index=False, observed=True).agg(
+        "mean"
+    )
     tests = tests[
         tests.geo.isin(
-            tests.groupby("geo", as_index=False)
+            tests.groupby("geo", as_index=False, observed=True)
             .max()
             .nlargest(15, "tot_n_tests")
             .geo.values
@@ -73,18 +88,7 @@ def get_covid_datasets():
 
 
 def get_bilancio_datasets():
-
-    bilancio_1 = (
-        "https://raw.githubusercontent.com/buildnn/covid-19-ita/"
-        "master/data/2020---Legge-di-Bilancio---02-Economia-e-Finanze---DPCM-22"
-        "-09-2014-art3%20-%202020---Legge-di-Bilancio---02-E.csv"
-    )
-    bilancio_2 = (
-        "https://raw.githubusercontent.com/buildnn/covid-19-ita/"
-        "master/data/2020---Legge-di-Bilancio---15-Salute---DPCM-22-09-2014"
-        "-art3%20-%202020---Legge-di-Bilancio---15-S.csv"
-    )
-    bilancio = pd.concat([pd.read_csv(bilancio_1), pd.read_csv(bilancio_2)])
+    bilancio = load_budget(programmi + p2, years=[2020])
 
     bilancio_prep = (
         bilancio.loc[
@@ -114,10 +118,18 @@ def get_bilancio_datasets():
 
 
 def plot(
-    df, x, y, pl_kwargs, labels, title, update_layout_kwargs, line_shape=None
+    df,
+    x,
+    y,
+    pl_kwargs,
+    labels,
+    title,
+    update_layout_kwargs,
+    line_shape=None,
+    doubling=None,
 ):
     fig = px.line(
-        df,
+        plain(df),
         x=x,
         y=y,
         color="geo",
@@ -158,6 +170,20 @@ def plot(
             trace["mode"] = "markers+text"
         fig.add_trace(trace)
 
+    # `doubling` is a list of (period, name, color) reference curves, drawn
+    # from the median `y` at day 0: none without a value at day 0.
+    start = df.loc[df[x] == 0, y].median() if doubling else np.nan
+    if pd.notna(start):
+        fig.add_traces(
+            doubling_traces(
+                np.arange(int(df[x].max()) + 1),
+                df[y].max(),
+                doubling,
+                start=start,
+                showlegend=False,
+            )
+        )
+
     update_kwa = dict(
         width=400,
         margin={"r": 20, "b": 180, "t": 80, "l": 70, "autoexpand": False},
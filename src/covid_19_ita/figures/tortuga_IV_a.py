@@ -13,6 +13,7 @@ from covid_19_ita.figures.tortuga_IV import (
     plot,
     programmi,
 )
+from covid_19_ita.registry import register
 from covid_19_ita.utils import watermark
 
 pd.options.display.max_rows = 6
@@ -22,6 +23,11 @@ config = {
     "Zoom": True,
     "displaylogo": False,
 }
+ECDC_OWID_SOURCE = (
+    "Fonte: Fonte: European Centre for Disease Prevention and Control, "
+    "Our World in Data"
+)
+MEF_SOURCE = "Fonte: Fonte: Open Data Ministero dell'Economia e Finanze."
 labels = {
     "tot_n_tests": "N. Test Effettuati",
     "tot_n_tests_pthab": "N. Test Effettuati per 1000 abitanti",
@@ -32,40 +38,43 @@ labels = {
 }
 
 
-if __name__ == "__main__":
+def source_note(fig, y):
+    return fig.update_layout(
+        annotations=[
+            dict(
+                text=ECDC_OWID_SOURCE,
+                showarrow=False,
+                yref="paper",
+                y=y / fig.layout["height"],
+                font={"color": "grey", "size": 9},
+            )
+        ],
+    )
 
-    covid, tests = get_covid_datasets()
 
-    fig_a001 = plot(
+def fig_a001():
+    _, tests = get_covid_datasets()
+    fig = plot(
         tests,
         x="time",
         y="tot_n_tests",
         pl_kwargs={
-            "range_x": (tests.time.min(), tests.time.max() + pd.to_timedelta(36, "d"),)
+            "range_x": (
+                tests.time.min(),
+                tests.time.max() + pd.to_timedelta(36, "d"),
+            )
         },
         labels=labels,
         title="<b>Test COVID effettuati per Nazione</b>",
         update_layout_kwargs={},
         line_shape=None,
     )
-    fig_a001.update_layout(
-        annotations=[
-            dict(
-                text="Fonte: Fonte: European Centre for Disease Prevention and Control, Our World in Data",
-                showarrow=False,
-                yref="paper",
-                y=-240 / fig_a001.layout["height"],
-                font={"color": "grey", "size": 9},
-            )
-        ],
-    )
-    fig_a001.show(config=config)
-    fig_a001.write_html(
-        join(EXPORT_DIR, "fig_a001.html"), include_plotlyjs="cdn", config=config,
-    )
+    return source_note(fig, -240)
 
-    # COVID per nazione
-    fig_a002 = plot(
+
+def fig_a002():
+    _, tests = get_covid_datasets()
+    fig = plot(
         tests.query("epidemic_age >= 0"),
         x="epidemic_age",
         y="tot_n_tests",
@@ -75,24 +84,12 @@ if __name__ == "__main__":
         update_layout_kwargs={},
         line_shape=None,
     )
-    fig_a002.update_layout(
-        annotations=[
-            dict(
-                text="Fonte: Fonte: European Centre for Disease Prevention and Control, Our World in Data",
-                showarrow=False,
-                yref="paper",
-                y=-240 / fig_a002.layout["height"],
-                font={"color": "grey", "size": 9},
-            )
-        ],
-    )
-    fig_a002.show(config=config)
-    fig_a002.write_html(
-        join(EXPORT_DIR, "fig_a002.html"), include_plotlyjs="cdn", config=config,
-    )
+    return source_note(fig, -240)
+
 
-    # COVID per nazione
-    fig_a003 = plot(
+def fig_a003():
+    _, tests = get_covid_datasets()
+    fig = plot(
         tests.query("epidemic_age >= 0"),
         x="epidemic_age",
         y="tot_n_tests_pthab",
@@ -102,170 +99,56 @@ if __name__ == "__main__":
         update_layout_kwargs={},
         line_shape=None,
     )
-    fig_a003.update_layout(
-        annotations=[
-            dict(
-                text="Fonte: Fonte: European Centre for Disease Prevention and Control, Our World in Data",
-                showarrow=False,
-                yref="paper",
-                y=-240 / fig_a003.layout["height"],
-                font={"color": "grey", "size": 9},
-            )
-        ],
-    )
-    fig_a003.show(config=config)
-    fig_a003.write_html(
-        join(EXPORT_DIR, "fig_a003.html"), include_plotlyjs="cdn", config=config,
-    )
+    return source_note(fig, -240)
 
-    df = covid[
-        covid.geo.isin(
-            list(covid.groupby("geo").active_cases.max().nlargest(9).index)
-            + ["South_Korea"]
-        )
-    ]
+
+def top_active(covid, n=9):
+    """`covid` of the `n` countries with the most active cases and South
+    Korea."""
+    top = covid.groupby("geo", observed=True).active_cases.max().nlargest(n)
+    top = list(top.index)
+    df = covid[covid.geo.isin(top + ["South_Korea"])]
     df = df.sort_values(["time", "geo"])
-    df["geo"] = df["geo"].str.replace("_", " ")
+    return df.assign(geo=df["geo"].str.replace("_", " "))
+
 
-    fig_a004 = plot(
-        df,
+def fig_a004(y="active_cases"):
+    """Published for active cases, also drawn for ``y="n_deceased"``."""
+    covid, _ = get_covid_datasets()
+    fig = plot(
+        top_active(covid),
         x="time",
-        y="active_cases",
-        pl_kwargs={"range_x": (pd.to_datetime("20200310"), pd.to_datetime("20200419"))},
+        y=y,
+        pl_kwargs={
+            "range_x": (pd.to_datetime("20200310"), pd.to_datetime("20200419"))
+        },
         labels=labels,
         title="<b>Test COVID effettuati per Nazione</b>",
         update_layout_kwargs={"width": 500, "showlegend": True},
     )
-    fig_a004.update_layout(
-        annotations=[
-            dict(
-                text="Fonte: Fonte: European Centre for Disease Prevention and Control, Our World in Data",
-                showarrow=False,
-                yref="paper",
-                y=-270 / fig_a004.layout["height"],
-                font={"color": "grey", "size": 9},
-            )
-        ],
-    )
-    fig_a004.show(config={"displaylogo": False})
-    fig_a004.write_html(
-        join(EXPORT_DIR, "fig_a004.html"), include_plotlyjs="cdn", config=config,
-    )
-
-    df = covid[
-        covid.geo.isin(
-            list(covid.groupby("geo").active_cases.max().nlargest(9).index)
-            + ["South_Korea"]
-        )
-    ]
-    df = df.sort_values(["time", "geo"])
-    df["geo"] = df["geo"].str.replace("_", " ")
-    x = "time"
-    y = "n_deceased"
-    range_x = (0, 4600)
-    labels = {
-        "time": "Data",
-        "epidemic_age": "Giorni Trascorsi dal 100° Contagio",
-    }
-    title = "<b>Test COVID effettuati per Nazione</b>"
-
-    fig = plot(
-        df,
-        x,
-        y,
-        {"range_x": (pd.to_datetime("20200310"), pd.to_datetime("20200419"))},
-        labels,
-        title,
-        {"width": 500, "showlegend": True},
-    )
-    fig.update_layout(
-        annotations=[
-            dict(
-                text="Fonte: Fonte: European Centre for Disease Prevention and Control, Our World in Data",
-                showarrow=False,
-                yref="paper",
-                y=-270 / fig.layout["height"],
-                font={"color": "grey", "size": 9},
-            )
-        ],
-    ).show(config={"displaylogo": False})
+    return source_note(fig, -270)
 
-    df = covid[
-        covid.geo.isin(
-            list(covid.groupby("geo").active_cases.max().nlargest(9).index)
-            + ["South_Korea"]
-        )
-    ]
-    df = df.sort_values(["time", "geo"])
-    df["geo"] = df["geo"].str.replace("_", " ")
-    x = "time"
-    y = "n_deceased"
-    range_x = (0, 4600)
-    labels = {
-        "n_deceased": "Decessi",
-        "time": "Data",
-        "epidemic_age": "Giorni Trascorsi dal 100° Contagio",
-    }
-    title = "<b>Test COVID effettuati per Nazione</b>"
 
-    fig = plot(
-        df,
-        x,
-        y,
-        {"range_x": (pd.to_datetime("20200310"), pd.to_datetime("20200419"))},
-        labels,
-        title,
-        {"width": 500, "showlegend": True},
-    )
-    fig.update_layout(
-        annotations=[
-            dict(
-                text="Fonte: Fonte: European Centre for Disease Prevention and Control, Our World in Data",
-                showarrow=False,
-                yref="paper",
-                y=-270 / fig.layout["height"],
-                font={"color": "grey", "size": 9},
-            )
-        ],
-    ).show(config={"displaylogo": False})
-
-    bilancio, bilancio_data = get_bilancio_datasets()
-
-    (
-        bilancio_data.style.format({"Previsioni iniziali competenza": "€ {0:,.0f}"})
-        .bar(
-            color="#FFA07A",
-            vmin=10_000,
-            subset=["Previsioni iniziali competenza"],
-            align="zero",
-        )
-        .set_table_styles(
-            [
-                dict(selector="th", props=[("font-size", "100%"), ("height", "26px")],),
-                dict(
-                    selector="caption",
-                    props=[
-                        ("caption-side", "bottom"),
-                        ("align", "left"),
-                        ("margin-top", "25px"),
-                    ],
-                ),
-            ]
-        )
-        .set_caption("Fonte: Open Data Ministero dell'Economia e Finanze.")
-    )
-    #
+def fig_bilancio_azioni():
+    """Budget of each administration by program, action and chapter: not
+    published."""
+    bilancio, _ = get_bilancio_datasets()
+    figs = []
     for (h, mb), ammne in zip(
-        [(650, -0.36), (750, -0.24)], bilancio["Descrizione Amministrazione"].unique(),
+        [(650, -0.36), (750, -0.24)],
+        bilancio["Descrizione Amministrazione"].unique(),
     ):
         subset = bilancio.loc[
             (bilancio["Descrizione Amministrazione"] == ammne)
             & bilancio["Descrizione Programma"].isin(programmi + p2)
         ]
-        subset["Denominazione Capitolo"] = subset[
-            "Denominazione Capitolo"
-        ].str.capitalize()
-        # desc_prog_short =
+        subset = subset.assign(
+            **{
+                "Denominazione Capitolo": subset[
+                    "Denominazione Capitolo"
+                ].str.capitalize()
+            }
+        )
         f = px.bar(
             subset,
             x="Previsioni iniziali competenza",
@@ -298,7 +181,7 @@ if __name__ == "__main__":
             yaxis={"title": None},
             annotations=[
                 dict(
-                    text="Fonte: Fonte: Open Data Ministero dell'Economia e Finanze.",
+                    text=MEF_SOURCE,
                     showarrow=False,
                     yref="paper",
                     y=mb * 0.9,
@@ -306,12 +189,26 @@ if __name__ == "__main__":
                 )
             ],
         )
-        watermark(f).show()
-    bilancio_data = bilancio.loc[bilancio["Descrizione Programma"].isin(programmi + p2)]
+        figs.append(watermark(f))
+    return figs
+
+
+def fig_bilancio():
+    """Budget table and sunburst by administration, program and action: not
+    published."""
+    bilancio, _ = get_bilancio_datasets()
+    bilancio_data = bilancio.loc[
+        bilancio["Descrizione Programma"].isin(programmi + p2)
+    ]
+    columns = [
+        "Descrizione Amministrazione",
+        "Descrizione Programma",
+        "Descrizione Azione",
+        "Previsioni iniziali competenza",
+    ]
     fig = make_subplots(
         rows=2,
         cols=1,
-        # shared_xaxes=True,
         row_heights=[800, 1250],
         column_widths=[450],
         vertical_spacing=0.03,
@@ -319,26 +216,9 @@ if __name__ == "__main__":
     )
     fig.add_trace(
         go.Table(
-            header=dict(
-                values=[
-                    "Descrizione Amministrazione",
-                    "Descrizione Programma",
-                    "Descrizione Azione",
-                ]
-                + ["Previsioni iniziali competenza"],
-                font=dict(size=10),
-                align="left",
-            ),
+            header=dict(values=columns, font=dict(size=10), align="left"),
             cells=dict(
-                values=[
-                    bilancio_data[k].tolist()
-                    for k in [
-                        "Descrizione Amministrazione",
-                        "Descrizione Programma",
-                        "Descrizione Azione",
-                    ]
-                    + ["Previsioni iniziali competenza"]
-                ],
+                values=[bilancio_data[k].tolist() for k in columns],
                 align="left",
             ),
         ),
@@ -348,16 +228,9 @@ if __name__ == "__main__":
 
     sb = px.sunburst(
         bilancio_data,
-        path=[
-            "Descrizione Amministrazione",
-            "Descrizione Programma",
-            "Descrizione Azione",
-        ],
+        path=columns[:3],
         values="Previsioni iniziali competenza",
-        # color="Previsioni iniziali competenza",
-        # color_continuous_scale='RdBu',
     )
-    # sb.layout.coloraxis.showscale = False
     for t in sb.select_traces():
         fig.add_trace(t, row=1, col=1)
     fig.update_layout(
@@ -365,7 +238,7 @@ if __name__ == "__main__":
         width=600,
         annotations=[
             dict(
-                text="Fonte: Fonte: Open Data Ministero dell'Economia e Finanze.",
+                text=MEF_SOURCE,
                 showarrow=False,
                 yref="paper",
                 y=-0.02,
@@ -373,4 +246,19 @@ if __name__ == "__main__":
             )
         ],
     )
-    watermark(fig)
+    return watermark(fig)
+
+
+for name, build in [
+    ("fig_a001", fig_a001),
+    ("fig_a002", fig_a002),
+    ("fig_a003", fig_a003),
+    ("fig_a004", fig_a004),
+]:
+    register(
+        f"tortuga/IV/{name}",
+        build,
+        join(EXPORT_DIR, f"{name}.html"),
+        datasets=["ecdc", "owid-tests"],
+        config=config,
+    )
@@ -4,18 +4,25 @@ import plotly.express as px
 import plotly.graph_objects as go
 
 from covid_19_ita import SITE_DIR
+from covid_19_ita.cache import DPC_SOURCES
+from covid_19_ita.fetch import requires
+from covid_19_ita.figcache import cached_figure
 from covid_19_ita.figures.tortuga import (
     line_double_trace,
     prep_dpc_regions,
     prep_dpc_ita,
     prep_korea,
 )
+from covid_19_ita.registry import register
+from covid_19_ita.schema import plain
 from covid_19_ita.utils import watermark
 
 # TARGET_DIR = "tmp"
 TARGET_DIR = join(SITE_DIR, "figures", "tortuga", "IV")
 
 
+@cached_figure("dpc-regions-prep")
+@requires(DPC_SOURCES["dpc-regions"])
 def fig_e001():
     regioni = prep_dpc_regions()
     id_vars = [
@@ -36,7 +43,7 @@ def fig_e001():
         "new_deceased",
         "new_discharged",
     ]
-    hosp_melted = regioni.melt(id_vars=id_vars, value_vars=value_vars)
+    hosp_melted = plain(regioni).melt(id_vars=id_vars, value_vars=value_vars)
     hosp_melted
 
     f1 = (
@@ -77,7 +84,7 @@ def fig_e001():
     )
 
     f2 = px.bar(
-        regioni[regioni.region.isin(["Lombardia", "Veneto"])],
+        plain(regioni[regioni.region.isin(["Lombardia", "Veneto"])]),
         x="time",
         y="being_tested",
         color_discrete_sequence=["steelblue"],
@@ -105,6 +112,8 @@ def fig_e001():
     return f1
 
 
+@cached_figure("dpc-regions-prep")
+@requires(DPC_SOURCES["dpc-regions"])
 def fig_e002():
     regioni = prep_dpc_regions()
     x = "time"
@@ -157,6 +166,8 @@ def fig_e002():
     return fig
 
 
+@cached_figure("dpc-regions-prep")
+@requires(DPC_SOURCES["dpc-regions"])
 def fig_e003():
     regioni = prep_dpc_regions().query("epidemic_age >= 0")
     d1 = regioni.query("region == 'Lombardia'")
@@ -206,22 +217,21 @@ def fig_e003():
     return fig
 
 
-if __name__ == "__main__":
-
-    fig_e001().write_html(
-        join(TARGET_DIR, "fig_e001.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-
-    fig_e002().write_html(
-        join(TARGET_DIR, "fig_e002.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
-
-    fig_e003().write_html(
-        join(TARGET_DIR, "fig_e003.html"),
-        config={"displaylogo": False},
-        include_plotlyjs="cdn",
-    )
+register(
+    "tortuga/IV/fig_e001",
+    fig_e001,
+    join(TARGET_DIR, "fig_e001.html"),
+    datasets=["dpc-regions-prep"],
+)
+register(
+    "tortuga/IV/fig_e002",
+    fig_e002,
+    join(TARGET_DIR, "fig_e002.html"),
+    datasets=["dpc-regions-prep"],
+)
+register(
+    "tortuga/IV/fig_e003",
+    fig_e003,
+    join(TARGET_DIR, "fig_e003.html"),
+    datasets=["dpc-regions-prep"],
+)
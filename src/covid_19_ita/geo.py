@@ -0,0 +1,171 @@
+"""Geography and population index: comune -> province -> region -> NUTS.
+
+The administrative hierarchy comes from the ISTAT "Elenco comuni italiani"
+and populations from the ISTAT and Ministero della Salute tables parsed by
+`covid_health`. Both are parsed once into snapshots (see
+`covid_19_ita.cache`) and memoized in the dataset registry, so figures can
+join populations and parent codes by integer code without parsing a DPC
+time series.
+
+Codes are ISTAT integer codes; provinces use the historical province code,
+the same used by DPC. DPC reports the autonomous provinces of Trento (22)
+and Bolzano (21) as regions: ``dpc_region_code`` follows that convention.
+"""
+import io
+import logging
+
+import pandas as pd
+from covid_health.ita import prep_istat, prep_salutegov
+
+from covid_19_ita.cache import cache_key, cached_frame, daily_key
+from covid_19_ita.datasets import dataset
+from covid_19_ita.fetch import fetch, requires
+
+logger = logging.getLogger("covid_19_ita")
+
+ELENCO_COMUNI = (
+    "https://www.istat.it/storage/codici-unita-amministrative/"
+    "Elenco-comuni-italiani.csv"
+)
+# Header prefixes of the Elenco columns: ISTAT appends footnote marks and
+# NUTS vintages to the names, the first matching column is used.
+ELENCO_COLUMNS = {
+    "Codice Comune formato numerico": "comune_code",
+    "Denominazione in italiano": "comune",
+    "Codice Provincia (Storico)": "province_code",
+    "Denominazione dell'Unità territoriale sovracomunale": "province",
+    "Sigla automobilistica": "province_abbr",
+    "Codice Regione": "region_code",
+    "Denominazione Regione": "region",
+    "Codice NUTS1": "nuts1",
+    "Codice NUTS2": "nuts2",
+    "Codice NUTS3": "nuts3",
+}
+AUTONOMOUS_PROVINCES = (21, 22)
+# Year of the population of the comuni in `asl_comuni_pop`.
+ASL_POP_YEAR = 2018
+
+
+def _parse_elenco(content: bytes) -> pd.DataFrame:
+    elenco = pd.read_csv(
+        io.BytesIO(content), sep=";", encoding="latin-1", dtype=str
+    )
+    columns = {}
+    for prefix, name in ELENCO_COLUMNS.items():
+        match = [col for col in elenco.columns if col.startswith(prefix)]
+        if not match:
+            raise KeyError(f"no '{prefix}' column in {ELENCO_COMUNI}.")
+        columns[match[0]] = name
+
+    comuni = elenco[list(columns)].rename(columns=columns)
+    for col in ["comune_code", "province_code", "region_code"]:
+        comuni[col] = comuni[col].astype(int)
+    comuni["dpc_region_code"] = comuni["region_code"].where(
+        ~comuni["province_code"].isin(AUTONOMOUS_PROVINCES),
+        comuni["province_code"],
+    )
+    return comuni
+
+
+@dataset("geo-comuni")
+@requires(ELENCO_COMUNI)
+def comuni() -> pd.DataFrame:
+    content = fetch(ELENCO_COMUNI)
+    return cached_frame(
+        "geo-comuni",
+        cache_key("geo-comuni", content),
+        lambda: _parse_elenco(content),
+    )
+
+
+@dataset("geo-provinces")
+def provinces() -> pd.DataFrame:
+    return (
+        comuni()
+        .drop(columns=["comune_code", "comune"])
+        .drop_duplicates("province_code")
+        .set_index("province_code")
+        .sort_index()
+    )
+
+
+@dataset("geo-regions")
+def regions() -> pd.DataFrame:
+    return (
+        comuni()[["region_code", "region", "nuts1", "nuts2"]]
+        .drop_duplicates("region_code")
+        .set_index("region_code")
+        .sort_index()
+    )
+
+
+def _parse_population() -> pd.DataFrame:
+    prov = prep_istat.parse_istat_geodemo("2019_pop_provinces")
+    prov = pd.DataFrame(
+        {
+            "level": "province",
+            "code": prov["province_code"].astype(int),
+            "year": 2019,
+            "population": prov["population"].astype(float),
+        }
+    )
+
+    asl = prep_salutegov.parse_dataset("asl_comuni_pop")
+    asl = asl[asl["region_code"].fillna("").str.strip() != ""]
+    total = (
+        asl["TOTALE"]
+        .str.replace(".", "", regex=False)
+        .str.replace(",", ".", regex=False)
+    )
+    asl = pd.DataFrame(
+        {
+            "code": asl["region_code"].astype(int),
+            "population": pd.to_numeric(total, errors="coerce"),
+        }
+    )
+    reg = asl.groupby("code", as_index=False)["population"].sum()
+    reg["level"] = "region"
+    reg["year"] = ASL_POP_YEAR
+
+    return pd.concat([prov, reg], ignore_index=True)[
+        ["level", "code", "year", "population"]
+    ]
+
+
+@dataset("geo-population")
+def population_table() -> pd.DataFrame:
+    """Populations as published: ``level, code, year, population``."""
+    return cached_frame(
+        "geo-population", daily_key("geo-population"), _parse_population
+    )
+
+
+def population(level, year) -> pd.Series:
+    """Population of `level` ("province", "region" or "dpc_region") in
+    `year`, indexed by integer code.
+
+    Levels not published for `year` are summed up from the provinces.
+    """
+    table = population_table()
+    rows = table[(table["level"] == level) & (table["year"] == year)]
+    if len(rows):
+        return rows.set_index("code")["population"].rename_axis(
+            f"{level}_code"
+        )
+
+    rows = table[(table["level"] == "province") & (table["year"] == year)]
+    if not len(rows):
+        raise KeyError(f"no population for {level} in {year}.")
+    parents = provinces()[f"{level}_code"]
+    return (
+        rows.set_index("code")["population"]
+        .groupby(parents.reindex(rows["code"].to_numpy()).to_numpy())
+        .sum()
+        .rename_axis(f"{level}_code")
+    )
+
+
+def names(level) -> pd.Series:
+    """Names of `level` ("province" or "region") indexed by integer code."""
+    frame = provinces() if level == "province" else regions()
+    return frame[level]
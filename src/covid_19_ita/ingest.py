@@ -0,0 +1,137 @@
+"""Incremental ingestion of daily time series.
+
+The processed table of a source is stored under ``CACHE_DIR/ingest`` together
+with a hash of every raw row. On update, the fresh rows are compared with the
+stored hashes and derived columns are recomputed only from the first date
+that was added or revised upstream; older rows are reused as they are.
+"""
+import hashlib
+import json
+import logging
+import os
+from glob import escape as glob_escape, glob
+from os.path import exists, join
+
+import pandas as pd
+
+from covid_19_ita import CACHE_DIR
+
+logger = logging.getLogger("covid_19_ita")
+
+INGEST_DIR = join(CACHE_DIR, "ingest")
+HASH_COL = "_row_hash"
+
+
+def table_paths(name, version):
+    """Paths of the table of `name` at `version` and of the metadata of
+    `name`, pointing to its current version."""
+    tag = hashlib.sha256(version.encode()).hexdigest()[:16]
+    path = join(INGEST_DIR, name)
+    return f"{path}.{tag}.parquet", path + ".json"
+
+
+def row_hashes(frame: pd.DataFrame, columns) -> pd.Series:
+    return pd.Series(
+        pd.util.hash_pandas_object(frame[columns], index=False).values,
+        index=frame.index,
+    )
+
+
+def load_table(name, version):
+    table_path, meta_path = table_paths(name, version)
+    if not (exists(table_path) and exists(meta_path)):
+        return None, None
+    with open(meta_path, "r") as meta_in:
+        meta = json.load(meta_in)
+    if meta["version"] != version:
+        return None, None
+    return pd.read_parquet(table_path), meta
+
+
+def store_table(name, table, version, columns):
+    """Store `table` as the current version of `name` and remove the tables
+    of the versions it supersedes."""
+    table_path, meta_path = table_paths(name, version)
+    os.makedirs(INGEST_DIR, exist_ok=True)
+    table.to_parquet(table_path + ".tmp")
+    os.replace(table_path + ".tmp", table_path)
+    with open(meta_path + ".tmp", "w") as meta_out:
+        json.dump({"version": version, "columns": list(columns)}, meta_out)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    # Tables of other versions, and the unversioned one of older releases.
+    stale = glob(join(INGEST_DIR, glob_escape(name) + ".*parquet"))
+    for path in set(stale) - {table_path}:
+        os.remove(path)
+        logger.debug(f">>> ingest {name}: removed superseded {path}.")
+
+
+def check_unique(frame, by, name="frame"):
+    """Raise a ValueError if rows of `frame` share their `by` values."""
+    duplicated = int(frame.duplicated(by).sum())
+    if duplicated:
+        raise ValueError(
+            f"{duplicated} rows of {name} repeat the {by} of another row."
+        )
+
+
+def first_changed_date(base, fresh, keys, time_col="time"):
+    """First date with rows added, removed or revised; None if unchanged.
+
+    Raise a ValueError if rows of `fresh` share their `keys` and date.
+    """
+    by = list(keys) + [time_col]
+    check_unique(fresh, by)
+    old = pd.Series(
+        base[HASH_COL].values, index=pd.MultiIndex.from_frame(base[by])
+    )
+    new = pd.Series(
+        fresh[HASH_COL].values, index=pd.MultiIndex.from_frame(fresh[by])
+    )
+    old, new = old.align(new, join="outer")
+    changed = old.ne(new)
+    if not changed.any():
+        return None
+    return changed[changed].index.get_level_values(time_col).min()
+
+
+def update(name, fresh, keys, derive, version, time_col="time", context=1):
+    """Return `derive(fresh)`, recomputing only the changed tail.
+
+    `derive` receives a frame sorted by `keys` and `time_col` and must only
+    look back `context` rows per group: those rows are passed along with the
+    tail so that its first deltas are computed against the stored history.
+    """
+    by = list(keys) + [time_col]
+    check_unique(fresh, by, name)
+    columns = list(fresh.columns)
+    fresh = fresh.sort_values(by, kind="mergesort")
+    fresh[HASH_COL] = row_hashes(fresh, columns)
+
+    base, meta = load_table(name, version)
+    if base is not None and meta["columns"] != columns:
+        base = None
+
+    if base is None:
+        logger.info(f">>> ingest {name}: full build ({len(fresh)} rows).")
+        table = derive(fresh)
+    else:
+        first = first_changed_date(base, fresh, keys, time_col=time_col)
+        if first is None:
+            logger.info(f">>> ingest {name}: up to date.")
+            return base.drop(columns=[HASH_COL])
+
+        history = fresh[fresh[time_col] < first]
+        tail = fresh[fresh[time_col] >= first]
+        lookback = history.groupby(list(keys), sort=False).tail(context)
+        derived = derive(pd.concat([lookback, tail]).sort_values(by))
+        derived = derived[derived[time_col] >= first]
+        logger.info(
+            f">>> ingest {name}: {len(derived)} rows from {first} derived, "
+            f"{(base[time_col] < first).sum()} reused."
+        )
+        table = pd.concat([base[base[time_col] < first], derived])
+        table = table.sort_values(by, kind="mergesort")
+
+    store_table(name, table, version, columns)
+    return table.drop(columns=[HASH_COL])
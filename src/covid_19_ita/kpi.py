@@ -0,0 +1,72 @@
+"""Registry of the ratio KPIs plotted by the figures.
+
+Each KPI is declared once with `register` as a `DataFrame.eval` expression
+over base columns (and ``population``), so the same definition applies to
+regional, provincial and world frames having those columns. KPIs are only
+computed when asked for with `evaluate`, and the results are memoized per
+dataset version: registering more KPIs costs nothing to the figures that do
+not use them.
+"""
+import logging
+from collections import namedtuple
+
+import pandas as pd
+
+logger = logging.getLogger("covid_19_ita")
+
+Kpi = namedtuple("Kpi", ["name", "expr", "digits"])
+
+KPIS = {}
+_values = {}
+
+
+def register(name, expr, digits=2):
+    KPIS[name] = Kpi(name, expr, digits)
+
+
+register("test_pthab", "n_tested / (population / 1000)")
+register("test_pdisch", "n_tested / n_discharged_recovered")
+register("test_picu", "n_tested / n_intensive_care")
+register("test_pdec", "n_tested / n_deceased")
+register("test_phosp", "n_tested / n_hospitalized")
+register("mortality", "n_deceased / tot_n_cases")
+register("deaths_pthab", "n_deceased / (population / 1000)")
+register("deaths_phhab", "n_deceased / (population / 10000)")
+register("pos_pthab", "totale_positivi / population * 1000")
+
+
+def evaluate(frame: pd.DataFrame, names, dataset=None, version=None):
+    """Frame of KPIs `names` computed on `frame`.
+
+    With `dataset` and `version` (see `covid_19_ita.cache.dataset_version`)
+    identifying the content of `frame`, results are kept until the version
+    of `dataset` changes.
+    """
+    unknown = [name for name in names if name not in KPIS]
+    if unknown:
+        raise KeyError(f"unknown KPIs: {unknown}.")
+
+    if dataset is None or version is None:
+        cached = {}
+    else:
+        key = (dataset, version)
+        for stale in [k for k in _values if k[0] == dataset and k != key]:
+            del _values[stale]
+        cached = _values.setdefault(key, {})
+
+    for name in names:
+        if name not in cached:
+            kpi = KPIS[name]
+            cached[name] = frame.eval(kpi.expr).round(kpi.digits)
+            logger.debug(f">>> kpi {name} computed on {dataset} ({version})")
+
+    return pd.DataFrame({name: cached[name] for name in names})
+
+
+def with_kpis(frame: pd.DataFrame, names, dataset=None, version=None):
+    """`frame` joined with the KPIs `names`."""
+    return frame.join(evaluate(frame, names, dataset, version))
+
+
+def clear():
+    _values.clear()
@@ -0,0 +1,114 @@
+"""Streaming rollups of the ISTAT municipal daily deaths file.
+
+ISTAT publishes one row per comune, age class and day of the year (``GE``,
+as ``MMDD``) with one ``T_YY`` column of total deaths per year. The file is
+read in chunks of `CHUNKSIZE` rows and each chunk is reduced to
+province/day/year totals before the next one is read, so peak memory depends
+on the chunk size and the number of provinces and days, not on the file.
+"""
+import glob
+import hashlib
+import logging
+import os
+import re
+from os.path import exists, join
+
+import pandas as pd
+
+from covid_19_ita import CACHE_DIR, DATA_DIR
+
+logger = logging.getLogger("covid_19_ita")
+
+MUNICIPAL_DIR = join(DATA_DIR, "dati-comunali-giornalieri-1")
+ROLLUP_DIR = join(CACHE_DIR, "rollups")
+CHUNKSIZE = 100_000
+ENCODING = "latin-1"
+YEAR_COLUMN = re.compile(r"^T_(\d{2})$")
+KEYS = ["REG", "PROV", "GE"]
+
+
+def municipal_file(data_dir=MUNICIPAL_DIR):
+    """Most recent csv in `data_dir`, ISTAT names them by release date."""
+    paths = sorted(glob.glob(join(data_dir, "*.csv")))
+    if not paths:
+        raise FileNotFoundError(f"no municipal deaths csv in {data_dir}.")
+    return paths[-1]
+
+
+def year_columns(path):
+    header = pd.read_csv(path, nrows=0, encoding=ENCODING)
+    return [col for col in header.columns if YEAR_COLUMN.match(col)]
+
+
+def _reduce(chunk, year_cols):
+    return chunk.groupby(KEYS)[year_cols].sum(min_count=1)
+
+
+def stream_province_deaths(path, chunksize=CHUNKSIZE) -> pd.DataFrame:
+    """Deaths per province and day, one row per (region, province, day)."""
+    year_cols = year_columns(path)
+    totals = None
+    reader = pd.read_csv(
+        path,
+        usecols=KEYS + year_cols,
+        na_values=["n.d."],
+        encoding=ENCODING,
+        chunksize=chunksize,
+    )
+    for n, chunk in enumerate(reader):
+        partial = _reduce(chunk, year_cols)
+        totals = (
+            partial if totals is None else totals.add(partial, fill_value=0)
+        )
+        logger.debug(f">>> {path}: chunk {n}, {len(totals)} rollup rows.")
+
+    deaths = totals.reset_index().melt(
+        id_vars=KEYS, var_name="year", value_name="n_deceased"
+    )
+    year = 2000 + deaths["year"].str[2:].astype(int)
+    deaths["time"] = pd.to_datetime(
+        pd.DataFrame(
+            {"year": year, "month": deaths.GE // 100, "day": deaths.GE % 100}
+        ),
+        errors="coerce",
+    )
+    deaths = deaths.dropna(subset=["time", "n_deceased"])
+    deaths = deaths.rename(
+        columns={"REG": "region_code", "PROV": "province_code"}
+    )
+    return deaths[["time", "region_code", "province_code", "n_deceased"]]
+
+
+def rollup_paths(path):
+    stat = os.stat(path)
+    key = hashlib.sha256(
+        f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+    ).hexdigest()[:16]
+    return {
+        level: join(ROLLUP_DIR, f"istat-deaths-{level}-{key}.parquet")
+        for level in ["province", "region"]
+    }
+
+
+def municipal_deaths_rollups(path=None, chunksize=CHUNKSIZE) -> dict:
+    """Province and region daily deaths, read from the rollup cache when the
+    source file has not changed since they were written."""
+    path = municipal_file() if path is None else path
+    paths = rollup_paths(path)
+    if all(exists(p) for p in paths.values()):
+        return {level: pd.read_parquet(p) for level, p in paths.items()}
+
+    province = stream_province_deaths(path, chunksize=chunksize)
+    region = province.groupby(["time", "region_code"], as_index=False)[
+        "n_deceased"
+    ].sum()
+    rollups = {
+        "province": province.sort_values(["province_code", "time"]),
+        "region": region.sort_values(["region_code", "time"]),
+    }
+
+    os.makedirs(ROLLUP_DIR, exist_ok=True)
+    for level, frame in rollups.items():
+        frame.to_parquet(paths[level], index=False)
+    logger.info(f">>> rollups of {path} written to {ROLLUP_DIR}.")
+    return rollups
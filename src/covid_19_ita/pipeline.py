@@ -0,0 +1,97 @@
+"""Lazy filter/projection/sort pipelines over the figure input frames.
+
+`LazyFrame(frame)` records filters (`DataFrame.eval` conditions, each one a
+conjunct), a column projection and a sort; `collect` runs them at once:
+the conjunct masks are combined, the sort order is computed on the key
+columns of the selected rows only, and the result is materialised with a
+single take. Frames derived from the same source share the masks already
+evaluated, keyed by condition, so figure variants only pay for the
+conditions they add.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("covid_19_ita")
+
+
+def conjuncts(conditions) -> tuple:
+    """`conditions` as a tuple: a single string is one conjunct."""
+    if conditions is None:
+        return ()
+    if isinstance(conditions, str):
+        return (conditions,)
+    return tuple(conditions)
+
+
+class LazyFrame:
+    def __init__(self, frame: pd.DataFrame, _masks=None):
+        self.frame = frame
+        self.filters = ()
+        self.columns = None
+        self.sort_by = None
+        self._masks = {} if _masks is None else _masks
+
+    def _derive(self, **changes):
+        lazy = LazyFrame(self.frame, self._masks)
+        lazy.filters = self.filters
+        lazy.columns = self.columns
+        lazy.sort_by = self.sort_by
+        for name, value in changes.items():
+            setattr(lazy, name, value)
+        return lazy
+
+    def filter(self, conditions):
+        """Keep the rows where all `conditions` hold.
+
+        Masks are shared by condition string, so conditions may not refer
+        to local variables with ``@``: format their values in instead.
+        """
+        local = [c for c in conjuncts(conditions) if "@" in c]
+        if local:
+            raise ValueError(f"conditions with local variables: {local}.")
+        new = [c for c in conjuncts(conditions) if c not in self.filters]
+        return self._derive(filters=self.filters + tuple(new))
+
+    def select(self, columns):
+        return self._derive(columns=list(dict.fromkeys(columns)))
+
+    def sort(self, by):
+        return self._derive(sort_by=[by] if isinstance(by, str) else list(by))
+
+    def mask(self, condition) -> np.ndarray:
+        if condition not in self._masks:
+            self._masks[condition] = np.asarray(
+                self.frame.eval(condition), dtype=bool
+            )
+        return self._masks[condition]
+
+    def collect(self) -> pd.DataFrame:
+        rows = np.ones(len(self.frame), dtype=bool)
+        for condition in self.filters:
+            rows &= self.mask(condition)
+        rows = np.flatnonzero(rows)
+
+        if self.sort_by:
+            keys = pd.DataFrame(
+                {
+                    col: self.frame[col].iloc[rows].reset_index(drop=True)
+                    for col in self.sort_by
+                }
+            )
+            order = keys.sort_values(self.sort_by, kind="mergesort").index
+            rows = rows[order.to_numpy()]
+
+        columns = np.arange(len(self.frame.columns))
+        if self.columns is not None:
+            columns = self.frame.columns.get_indexer(self.columns)
+            if (columns < 0).any():
+                missing = [
+                    col for col, i in zip(self.columns, columns) if i < 0
+                ]
+                raise KeyError(f"{missing} not in the frame columns.")
+        logger.debug(
+            f">>> collected {len(rows)} rows with {len(self.filters)} filters."
+        )
+        return self.frame.iloc[rows, columns]
@@ -0,0 +1,321 @@
+"""Registry of the site figures and parallel build of the registry.
+
+Figure modules declare each output with `register`: an id, the builder
+returning the plotly figure, the output path and the datasets it reads
+(names of `covid_19_ita.hydrate.PARSED` or of the dataset registry, see
+`covid_19_ita.datasets`). Remote sources are those the builder declares with
+`covid_19_ita.fetch.requires`.
+
+`build` runs the selected figures as a two-level DAG: their sources are
+downloaded and their datasets built once in this process, then the figures
+are built and written by a pool of processes reading the warm cache. A
+figure whose dataset could not be built is reported with that error and not
+run.
+
+Workers are forked where the platform allows it, so that they inherit the
+datasets built in memory and the prefetched sources. Elsewhere (spawn),
+they import the figure modules again and rebuild their datasets from the
+on-disk cache: correct, but slower.
+
+With `split`, figures are written as JSON and a thin HTML shell sharing one
+plotly.js bundle (see `covid_19_ita.export`).
+
+Each output written is recorded in `MANIFEST`, kept in the local cache
+rather than published with the site, with the versions of its inputs and
+the hash of its code (see `covid_19_ita.figcache`): `build` only rebuilds
+the outputs that are missing or whose record no longer matches.
+"""
+import fnmatch
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from os.path import exists, join, relpath
+from time import perf_counter
+
+from covid_19_ita import CACHE_DIR, PROJECT_DIR, datasets, fetch
+from covid_19_ita import export, figcache, hydrate
+
+logger = logging.getLogger("covid_19_ita")
+
+Figure = namedtuple("Figure", ["id", "build", "path", "datasets", "config"])
+
+CONFIG = {"displaylogo": False}
+FIGURE_MODULES = hydrate.FIGURE_MODULES
+MANIFEST = join(CACHE_DIR, "figures-manifest.json")
+
+FIGURES = {}
+
+
+def register(id_, build, path, datasets=(), config=None):
+    """Declare figure `id_`: ``build()`` returns the figure written to
+    `path` as HTML with plotly `config`."""
+    FIGURES[id_] = Figure(
+        id_, build, path, tuple(datasets), CONFIG if config is None else config
+    )
+
+
+def load(modules=FIGURE_MODULES) -> dict:
+    """Import the figure `modules`, which register their figures."""
+    for module_name in modules:
+        importlib.import_module(module_name)
+    return FIGURES
+
+
+def select(only=None) -> list:
+    """Registered figures whose id matches one of the glob patterns `only`
+    (all of them if empty)."""
+    figures = list(load().values())
+    if not only:
+        return figures
+    selected = [
+        figure
+        for figure in figures
+        if any(fnmatch.fnmatchcase(figure.id, pattern) for pattern in only)
+    ]
+    if not selected:
+        raise KeyError(f"no figure matches {list(only)}.")
+    return selected
+
+
+def _builder(figure):
+    # Variants are registered as `functools.partial` of the builder.
+    return getattr(figure.build, "func", figure.build)
+
+
+def plan(figures) -> tuple:
+    """Remote sources and datasets needed by `figures`, in build order:
+    parsed sources before the datasets derived from them."""
+    sources = fetch.collect_sources([_builder(figure) for figure in figures])
+    names = []
+    for figure in figures:
+        for name in figure.datasets:
+            if name not in names:
+                names.append(name)
+    names.sort(key=lambda name: name not in hydrate.PARSED)
+    return sources, names
+
+
+def _warm(name):
+    try:
+        if name in hydrate.PARSED:
+            hydrate.PARSED[name]()
+        else:
+            datasets.get(name)
+    except Exception as e:
+        logger.warning(f">>> could not build dataset {name}: {e}")
+        return e
+    return None
+
+
+def warm(sources, names, jobs=hydrate.JOBS, per_host=fetch.PER_HOST) -> dict:
+    """Download `sources` and build datasets `names`.
+
+    Parsed sources are built in `jobs` threads, then the datasets derived
+    from them in order. Return ``{name: exception}`` of the failed ones.
+    """
+    fetch.prefetch(sources, per_host=per_host)
+    parsed = [name for name in names if name in hydrate.PARSED]
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        errors = dict(zip(parsed, pool.map(_warm, parsed)))
+    for name in names[len(parsed):]:
+        errors[name] = _warm(name)
+    return {name: e for name, e in errors.items() if e is not None}
+
+
+def spec(figure) -> str:
+    """JSON of `figure`, read from the figure cache if its builder has one
+    (see `covid_19_ita.figcache`)."""
+    builder = _builder(figure)
+    if not hasattr(builder, "spec"):
+        return figure.build().to_json()
+    return builder.spec(
+        *getattr(figure.build, "args", ()),
+        **getattr(figure.build, "keywords", {}),
+    )
+
+
+def write(figure, split=False):
+    os.makedirs(os.path.dirname(figure.path), exist_ok=True)
+    if split:
+        export.write_split(spec(figure), figure.path, figure.config)
+    else:
+        figure.build().write_html(
+            figure.path, config=figure.config, include_plotlyjs="cdn"
+        )
+        export.remove_split(figure.path)
+
+
+# --- MANIFEST ---
+
+
+def load_manifest() -> dict:
+    if not exists(MANIFEST):
+        return {}
+    with open(MANIFEST, "r") as manifest_in:
+        return json.load(manifest_in)
+
+
+def store_manifest(manifest: dict):
+    os.makedirs(os.path.dirname(MANIFEST), exist_ok=True)
+    with open(MANIFEST + ".tmp", "w") as out:
+        json.dump(manifest, out, indent=1, sort_keys=True)
+    os.replace(MANIFEST + ".tmp", MANIFEST)
+
+
+def fingerprint(figure, split=False) -> dict:
+    """Versions of the inputs of `figure` and hash of the code building it.
+
+    Datasets are versioned with the code building them (see
+    `figcache.dataset_version`). Sources must be fetched already (see
+    `fetch.prefetch`)."""
+    builder = _builder(figure)
+    inputs = figcache.input_versions(builder)
+    inputs.update(
+        {name: figcache.dataset_version(name) for name in figure.datasets}
+    )
+    call = [
+        getattr(figure.build, "args", ()),
+        getattr(figure.build, "keywords", {}),
+        figure.config,
+        split,
+    ]
+    return {
+        "id": figure.id,
+        "inputs": inputs,
+        "code": figcache.digest([figcache.code_version(builder), call]),
+    }
+
+
+def staleness(figure, record, manifest) -> str:
+    """Why `figure`, with fingerprint `record`, must be rebuilt; empty if
+    its output is up to date in `manifest`."""
+    stored = manifest.get(relpath(figure.path, PROJECT_DIR))
+    if not exists(figure.path):
+        return "no output"
+    if stored is None:
+        return "not in manifest"
+    changed = [
+        name
+        for name in sorted(set(record["inputs"]) | set(stored["inputs"]))
+        if record["inputs"].get(name) != stored["inputs"].get(name)
+    ]
+    if changed:
+        return "inputs changed: " + ", ".join(changed)
+    if record["code"] != stored["code"]:
+        return "code changed"
+    return ""
+
+
+def _init_worker():
+    # Sources were revalidated by `warm`: workers read the mirror only.
+    fetch.offline = True
+
+
+def _mp_context():
+    # Fork explicitly: the default start method is not fork everywhere (nor
+    # in recent Python versions), and workers rely on the warm memory.
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def _run(id_, split=False):
+    start = perf_counter()
+    figure = load()[id_]
+    try:
+        write(figure, split)
+    except Exception as e:
+        logger.warning(f">>> could not build {id_}: {e}")
+        return id_, e, figure.path, perf_counter() - start
+    return id_, "built", figure.path, perf_counter() - start
+
+
+def _outdated(figures, force, split):
+    """Fingerprints of `figures`, the stale ones with the reason, and rows
+    of those skipped or that could not be versioned."""
+    manifest = load_manifest()
+    records = {}
+    stale = []
+    rows = []
+    for figure in figures:
+        try:
+            records[figure.id] = fingerprint(figure, split)
+        except Exception as e:
+            logger.warning(f">>> could not version {figure.id}: {e}")
+            rows.append((figure.id, e, figure.path, 0.0, "inputs unavailable"))
+            continue
+        reason = "forced" if force else None
+        reason = reason or staleness(figure, records[figure.id], manifest)
+        if reason:
+            stale.append((figure, reason))
+        else:
+            rows.append((figure.id, "skipped", figure.path, 0.0, "up to date"))
+    return records, stale, rows
+
+
+def build(
+    only=None,
+    jobs=None,
+    dry_run=False,
+    force=False,
+    split=False,
+    per_host=fetch.PER_HOST,
+):
+    """Build the figures matching `only` that are stale, or all of them if
+    `force`, with `jobs` processes (default: one per core). With `split`,
+    figures are written as JSON and HTML shell.
+
+    Return rows of ``(id, status, path, seconds, reason)``, `status` being
+    ``"built"``, ``"skipped"``, ``"planned"`` with `dry_run` or the
+    exception raised, and `reason` why the figure was (or would be) built
+    or skipped.
+    """
+    start = perf_counter()
+    figures = select(only)
+    fetch.prefetch(plan(figures)[0], per_host=per_host)
+    records, stale, rows = _outdated(figures, force, split)
+    logger.info(
+        f">>> {len(stale)} of {len(figures)} figures to build, versioned in "
+        f"{perf_counter() - start:.2f}s."
+    )
+
+    if dry_run:
+        return rows + [
+            (figure.id, "planned", figure.path, 0.0, reason)
+            for figure, reason in stale
+        ]
+
+    if split:
+        export.write_plotlyjs()
+    names = plan([figure for figure, _ in stale])[1]
+    errors = warm([], names, per_host=per_host)
+    reasons = {}
+    for figure, reason in stale:
+        failed = [name for name in figure.datasets if name in errors]
+        if failed:
+            error = errors[failed[0]]
+            reason = f"dataset {failed[0]}"
+            rows.append((figure.id, error, figure.path, 0.0, reason))
+        else:
+            reasons[figure.id] = reason
+
+    with ProcessPoolExecutor(
+        max_workers=jobs or os.cpu_count(),
+        mp_context=_mp_context(),
+        initializer=_init_worker,
+    ) as pool:
+        built = list(pool.map(partial(_run, split=split), reasons))
+
+    manifest = load_manifest()
+    for id_, status, path, seconds in built:
+        rows.append((id_, status, path, seconds, reasons[id_]))
+        if status == "built":
+            manifest[relpath(path, PROJECT_DIR)] = records[id_]
+    if built:
+        store_manifest(manifest)
+    return rows
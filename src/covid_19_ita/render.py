@@ -100,6 +100,90 @@ def from_config(configfile, output, template_dir, log):
     )
 
 
+def format_size(nbytes):
+    for unit in ["B", "KiB", "MiB"]:
+        if nbytes < 1024:
+            return f"{nbytes:.0f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f} GiB"
+
+
+@click.command()
+@click.option("--check", is_flag=True, help="only revalidate freshness, do not download or parse.")
+@click.option("--jobs", type=click.INT, default=4, help="datasets parsed in parallel.")
+@click.option("--per-host", type=click.INT, default=4, help="concurrent downloads per host.")
+@click.option("--log", type=click.STRING, default="WARNING", help="one of DEBUG, INFO, WARNING, ERROR, FATAL")
+def fetch(check, jobs, per_host, log):
+    """ Downloads and parses every dataset used by the figures into the local
+        cache, printing timing, size and cache status of each source.
+    """
+    logging.basicConfig(level=getattr(logging, log, "WARNING"))
+    # Imported here: `from_config` does not need the data dependencies.
+    from covid_19_ita import hydrate
+
+    start = datetime.now()
+    if check:
+        rows = hydrate.check(per_host=per_host)
+    else:
+        rows = hydrate.hydrate(jobs=jobs, per_host=per_host)
+
+    failed = unknown = 0
+    for source, status, nbytes, seconds in rows:
+        if isinstance(status, Exception):
+            failed += 1
+            status = "error"
+        elif status in ("stale", "missing"):
+            failed += 1
+        elif status == "unknown":
+            # No validator to revalidate with: reported, not failed.
+            unknown += 1
+        click.echo(
+            f"{status:<13}{format_size(nbytes):>11}{seconds:>8.2f}s  {source}"
+        )
+    summary = f"{len(rows)} sources in {datetime.now() - start}"
+    if unknown:
+        summary += f", {unknown} of unknown freshness"
+    click.echo(summary + ".")
+    if failed:
+        raise SystemExit(1)
+
+
+@click.command()
+@click.option("--jobs", type=click.INT, default=None, help="figures built in parallel, one per core by default.")
+@click.option("--only", multiple=True, help="glob of the figure ids to build, e.g. 'tortuga/II/*'; repeatable.")
+@click.option("--dry-run", is_flag=True, help="only list the figures that would be built and why.")
+@click.option("--force", is_flag=True, help="rebuild the figures that are up to date too.")
+@click.option("--split", is_flag=True, help="write figure JSON and a thin HTML shell loading the shared plotly.js bundle.")
+@click.option("--log", type=click.STRING, default="WARNING", help="one of DEBUG, INFO, WARNING, ERROR, FATAL")
+def build(jobs, only, dry_run, force, split, log):
+    """ Builds the registered figures that are out of date into the site:
+        datasets first, then figures in parallel processes.
+    """
+    logging.basicConfig(level=getattr(logging, log, "WARNING"))
+    from covid_19_ita import registry
+
+    start = datetime.now()
+    rows = registry.build(
+        only=only, jobs=jobs, dry_run=dry_run, force=force, split=split
+    )
+    if dry_run:
+        sources, names = registry.plan(registry.select(only))
+        for source in sources:
+            click.echo(f"{'source':<13}{source}")
+        for name in names:
+            click.echo(f"{'dataset':<13}{name}")
+
+    failed = 0
+    for id_, status, path, seconds, reason in rows:
+        if isinstance(status, Exception):
+            failed += 1
+            status = "error"
+        click.echo(f"{status:<13}{seconds:>8.2f}s  {id_:<40}{reason}")
+    click.echo(f"{len(rows)} figures in {datetime.now() - start}.")
+    if failed:
+        raise SystemExit(1)
+
+
 @click.group()
 def cli():
     """ Runs report processing script to turn raw template from (./reports/templates) into
@@ -110,6 +194,8 @@ def cli():
 
 def main():
     cli.add_command(from_config)
+    cli.add_command(fetch)
+    cli.add_command(build)
     cli()
 
 
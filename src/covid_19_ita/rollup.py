@@ -0,0 +1,111 @@
+"""Rollup cube of the DPC series at every geographic level and date.
+
+The cube holds every count of the prepared DPC frames indexed by
+``(level, code, time)``: the ``"province"`` and ``"region"`` rows passed, as
+published by DPC, and ``"italy"`` (code 0) as the sum of the regions. It is
+stored with `covid_19_ita.ingest` and, when new days arrive, only the rows
+from the first changed date are replaced and summed again. Figures take
+slices of it with `select`, without any groupby.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from covid_19_ita import ingest
+from covid_19_ita.schema import COUNT_PREFIXES
+
+logger = logging.getLogger("covid_19_ita")
+
+KEYS = ["level", "code"]
+LEVELS = {"province": "province_code", "region": "region_code"}
+ITALY_CODE = 0
+
+
+def _long(frame, level):
+    code_col = LEVELS[level]
+    metrics = [
+        col
+        for col in frame.columns
+        if str(col).startswith(COUNT_PREFIXES) and is_numeric_dtype(frame[col])
+    ]
+    long = frame[["time", code_col] + metrics].rename(
+        columns={code_col: "code"}
+    )
+    long.insert(0, "level", level)
+    return long
+
+
+def _italy(regions):
+    italy = (
+        regions.drop(columns=KEYS + [ingest.HASH_COL])
+        .groupby("time", as_index=False)
+        .sum(min_count=1)
+    )
+    italy.insert(0, "level", "italy")
+    italy.insert(1, "code", ITALY_CODE)
+    # Sums are not published rows: a constant hash keeps them out of the
+    # change detection and the hash column unsigned.
+    italy[ingest.HASH_COL] = np.uint64(0)
+    return italy
+
+
+def update_cube(name, frames: dict, version) -> pd.DataFrame:
+    """Cube of `frames` (``{level: prepared frame}``), recomputed from the
+    first date added or revised since the stored one."""
+    fresh = pd.concat(
+        [_long(frame, level) for level, frame in frames.items()],
+        ignore_index=True,
+    )
+    columns = list(fresh.columns)
+    fresh = fresh.sort_values(KEYS + ["time"], kind="mergesort")
+    fresh[ingest.HASH_COL] = ingest.row_hashes(fresh, columns)
+
+    base, meta = ingest.load_table(name, version)
+    if base is not None and meta["columns"] != columns:
+        base = None
+
+    if base is None:
+        logger.info(f">>> rollup {name}: full build ({len(fresh)} rows).")
+        regions = fresh[fresh["level"] == "region"]
+        table = pd.concat([fresh, _italy(regions)], ignore_index=True)
+        ingest.store_table(name, table, version, columns)
+    else:
+        published = base[base["level"] != "italy"]
+        first = ingest.first_changed_date(published, fresh, KEYS)
+        if first is None:
+            logger.info(f">>> rollup {name}: up to date.")
+            table = base
+        else:
+            tail = fresh[fresh["time"] >= first]
+            regions = tail[tail["level"] == "region"]
+            table = pd.concat(
+                [base[base["time"] < first], tail, _italy(regions)],
+                ignore_index=True,
+            )
+            logger.info(
+                f">>> rollup {name}: {len(tail)} rows from {first} updated."
+            )
+            ingest.store_table(name, table, version, columns)
+
+    return (
+        table.drop(columns=[ingest.HASH_COL])
+        .set_index(KEYS + ["time"])
+        .sort_index()
+    )
+
+
+def select(
+    cube: pd.DataFrame, level, codes=None, start=None, end=None, metrics=None
+) -> pd.DataFrame:
+    """Rows of `level` for `codes` (all if None) between `start` and `end`
+    as a flat frame with ``code`` and ``time`` columns. Without `metrics`,
+    the metrics not reported at `level` are left out."""
+    codes = slice(None) if codes is None else list(codes)
+    rows = cube.loc[(level, codes, slice(start, end)), :]
+    if metrics is None:
+        rows = rows.dropna(axis=1, how="all")
+    else:
+        rows = rows[list(metrics)]
+    return rows.reset_index(level="level", drop=True).reset_index()
@@ -0,0 +1,112 @@
+"""Compact typed schema for the DPC, ECDC and Eurostat frames.
+
+`compact` turns label columns into categoricals, counts into the smallest
+signed integer type holding twice their magnitude (so that differences
+between two counts cannot overflow) and dates into day-resolution datetimes.
+The bytes saved are logged and kept in `reports`.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_string_dtype
+
+logger = logging.getLogger("covid_19_ita")
+
+CATEGORY_COLUMNS = (
+    "region",
+    "province",
+    "country",
+    "geo",
+    "geo_id",
+    "country_code",
+    "unit",
+    "facility",
+    "isco08",
+)
+COUNT_PREFIXES = (
+    "n_",
+    "tot_n_",
+    "new_",
+    "nuovi_",
+    "totale_",
+    "variazione_",
+    "active",
+    "being_tested",
+)
+INT_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+reports = {}
+
+
+def frame_nbytes(frame: pd.DataFrame) -> int:
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+
+def narrow_int(series: pd.Series) -> pd.Series:
+    values = series.to_numpy()
+    if len(values) == 0:
+        return series.astype(INT_TYPES[0])
+    bound = 2 * max(abs(int(values.min())), abs(int(values.max())))
+    for dtype in INT_TYPES:
+        if bound <= np.iinfo(dtype).max:
+            return series.astype(dtype)
+    return series
+
+
+def is_count(series: pd.Series) -> bool:
+    return (
+        str(series.name).startswith(COUNT_PREFIXES)
+        and series.notna().all()
+        and bool((series % 1 == 0).all())
+    )
+
+
+def compact(
+    frame: pd.DataFrame, name=None, categories=CATEGORY_COLUMNS
+) -> pd.DataFrame:
+    before = frame_nbytes(frame)
+    frame = frame.copy(deep=False)
+
+    for col in frame.columns:
+        series = frame[col]
+        if col in categories and is_string_dtype(series):
+            frame[col] = series.astype("category")
+        elif not isinstance(series.dtype, np.dtype):
+            continue
+        elif is_datetime64_any_dtype(series):
+            frame[col] = series.dt.floor("D")
+        elif series.dtype.kind in "iu":
+            frame[col] = narrow_int(series)
+        elif series.dtype.kind == "f" and is_count(series):
+            frame[col] = narrow_int(series)
+
+    after = frame_nbytes(frame)
+    reports[name] = (before, after)
+    logger.info(
+        f">>> compacted {name}: {before} -> {after} bytes "
+        f"({1 - after / max(before, 1):.0%} saved)."
+    )
+    return frame
+
+
+def plain(frame: pd.DataFrame) -> pd.DataFrame:
+    """Categorical columns back to objects, for plotly express."""
+    categorical = [
+        col
+        for col, dtype in frame.dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+    ]
+    if not categorical:
+        return frame
+    return frame.astype({col: object for col in categorical})
+
+
+def relabel(series: pd.Series, mapping) -> pd.Series:
+    """`series` with the values in `mapping` replaced, the others kept.
+
+    Unlike `Series.replace`, categoricals (see `compact`) may take new
+    labels: their categories are mapped, and stay categorical unless two
+    of them get the same label.
+    """
+    return series.map(lambda value: mapping.get(value, value))
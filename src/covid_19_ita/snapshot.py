@@ -0,0 +1,65 @@
+"""Memory-mapped snapshots of processed datasets.
+
+Snapshots are uncompressed Arrow IPC files under ``CACHE_DIR/snapshots``,
+one per dataset, tagged with a version string. `open_snapshot` memory-maps
+the file and wraps numeric columns zero-copy, so build workers on the same
+machine share one physical copy of each dataset through the page cache.
+Frames opened this way are backed by read-only memory.
+"""
+import logging
+import os
+from os.path import exists, join
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+
+from covid_19_ita import CACHE_DIR
+
+logger = logging.getLogger("covid_19_ita")
+
+SNAPSHOT_DIR = join(CACHE_DIR, "snapshots")
+VERSION_KEY = b"covid_19_ita.version"
+
+
+def snapshot_path(name):
+    return join(SNAPSHOT_DIR, f"{name}.arrow")
+
+
+def write_snapshot(name, frame: pd.DataFrame, version):
+    table = pa.Table.from_pandas(frame)
+    metadata = dict(table.schema.metadata or {})
+    metadata[VERSION_KEY] = str(version).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = snapshot_path(name)
+    with pa.OSFile(path + ".tmp", "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    # Workers holding the old file keep a valid mapping of the old inode.
+    os.replace(path + ".tmp", path)
+
+
+def snapshot_version(name):
+    path = snapshot_path(name)
+    if not exists(path):
+        return None
+    with pa.memory_map(path, "r") as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    version = metadata.get(VERSION_KEY)
+    return version.decode() if version is not None else None
+
+
+def open_snapshot(name, version=None):
+    """Memory-mapped frame of snapshot `name`, None if it is missing or
+    tagged with a version other than `version`."""
+    path = snapshot_path(name)
+    if not exists(path):
+        return None
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(source).read_all()
+    stored = (table.schema.metadata or {}).get(VERSION_KEY, b"").decode()
+    if version is not None and stored != str(version):
+        return None
+    return table.to_pandas(split_blocks=True)
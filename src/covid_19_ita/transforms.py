@@ -0,0 +1,161 @@
+"""Vectorized transforms of grouped time series.
+
+Functions take a frame whose rows are in time order within each group
+(groups may be interleaved, as in the ECDC and OWID frames sorted by date)
+and work on the underlying NumPy arrays, with no Python loop over groups.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("covid_19_ita")
+
+NEGATIVE_POLICIES = ("keep", "clip", "carry", "redistribute")
+
+
+def group_ids(frame: pd.DataFrame, by=None) -> np.ndarray:
+    """Integer group label of each row, all zeros when `by` is None.
+
+    Raise a ValueError if a key of `by` is missing: such rows belong to no
+    group.
+    """
+    if by is None:
+        return np.zeros(len(frame), dtype=np.intp)
+    ids = frame.groupby(by, sort=False, observed=True).ngroup()
+    # `ngroup` labels those rows -1, or NaN in recent pandas.
+    missing = int((ids.isna() | (ids < 0)).sum())
+    if missing:
+        raise ValueError(f"{missing} rows have a missing key in {by}.")
+    return ids.to_numpy(dtype=np.intp)
+
+
+def _group_names(frame: pd.DataFrame, by, ids) -> list:
+    """Label of each group of `ids`, its keys joined by "/" if `by` is a
+    list."""
+    if by is None:
+        return ["all"]
+    _, first_rows = np.unique(ids, return_index=True)
+    keys = frame[by].iloc[first_rows]
+    if isinstance(keys, pd.Series):
+        return keys.astype(str).tolist()
+    return ["/".join(map(str, row)) for row in keys.itertuples(index=False)]
+
+
+def _grouped(values, ids, how):
+    return pd.Series(values).groupby(ids).transform(how).to_numpy()
+
+
+def decumulate(
+    frame: pd.DataFrame, columns, by=None, first=0, negative="keep"
+) -> pd.DataFrame:
+    """Daily deltas of the cumulative `columns` of `frame`, per group `by`.
+
+    `columns` is a list of column names or a ``{column: new_name}`` dict.
+    Returns a new frame with the same index, `frame` is not modified.
+
+    `first` is the delta of the first row of each group: a scalar (0 or
+    ``np.nan``), or ``"cumulative"`` to take the cumulative value itself.
+
+    `negative` chooses how downward revisions of a cumulative count are
+    handled:
+
+    - ``"keep"``: negative deltas are returned as they are;
+    - ``"clip"``: negative deltas are set to 0;
+    - ``"carry"``: the revision is absorbed by the following days, deltas
+      stay at 0 until the count passes its previous peak again;
+    - ``"redistribute"``: the revision is taken back from the preceding
+      days, as if the earlier counts had been reported correctly.
+
+    ``"carry"`` and ``"redistribute"`` keep the deltas after the first row
+    non-negative. With ``first="cumulative"`` the deltas of a group sum to
+    the peak and to the last value of the count respectively. With a scalar
+    `first` they sum to `first` plus the rise from the first value to the
+    peak (``"carry"``) or from the lowest value to the last one
+    (``"redistribute"``).
+    """
+    if negative not in NEGATIVE_POLICIES:
+        raise ValueError(
+            f"negative must be one of {NEGATIVE_POLICIES}, got '{negative}'."
+        )
+    if not isinstance(columns, dict):
+        columns = {col: col for col in columns}
+
+    ids = group_ids(frame, by)
+    order = np.argsort(ids, kind="stable")
+    ids = ids[order]
+    starts = np.ones(len(ids), dtype=bool)
+    starts[1:] = ids[1:] != ids[:-1]
+
+    deltas = {}
+    for col, newcol in columns.items():
+        values = frame[col].to_numpy()[order]
+        if isinstance(first, float) and np.isnan(first):
+            values = values.astype(np.float64)
+
+        if negative == "carry":
+            values = _grouped(values, ids, "cummax")
+        elif negative == "redistribute":
+            values = _grouped(values[::-1], ids[::-1], "cummin")[::-1]
+
+        delta = np.empty_like(values)
+        delta[1:] = values[1:] - values[:-1]
+        delta[starts] = values[starts] if first == "cumulative" else first
+        if negative == "clip":
+            delta[delta < 0] = 0
+
+        result = np.empty_like(delta)
+        result[order] = delta
+        deltas[newcol] = result
+
+    return pd.DataFrame(deltas, index=frame.index)
+
+
+def anchor(
+    frame: pd.DataFrame,
+    columns,
+    anchor_date,
+    by=None,
+    time_col="time",
+    suffix="_anchored",
+    errors="warn",
+) -> pd.DataFrame:
+    """`columns` of `frame` divided by their value at `anchor_date`, per
+    group `by`, as new columns named with `suffix`.
+
+    Every requested column is returned. Groups without a row at
+    `anchor_date`, or whose anchor value is 0 or missing, get NaN; they are
+    logged when `errors` is ``"warn"`` and raise a ValueError when it is
+    ``"raise"``.
+    """
+    columns = list(columns)
+    ids = group_ids(frame, by)
+    n_groups = ids.max() + 1 if len(ids) else 0
+    at_anchor = (frame[time_col] == pd.Timestamp(anchor_date)).to_numpy()
+
+    values = frame[columns].to_numpy(dtype=np.float64)
+    anchors = np.full((n_groups, len(columns)), np.nan)
+    anchors[ids[at_anchor]] = values[at_anchor]
+    anchors[anchors == 0] = np.nan
+
+    invalid = np.isnan(anchors)
+    if invalid.any():
+        names = _group_names(frame, by, ids)
+        problems = [
+            f"{names[group]}: {columns[col]}"
+            for group, col in zip(*np.nonzero(invalid))
+        ]
+        message = (
+            f"no usable anchor at {anchor_date} for {len(problems)} "
+            f"group/column pairs ({', '.join(problems[:10])}"
+            f"{', ...' if len(problems) > 10 else ''})."
+        )
+        if errors == "raise":
+            raise ValueError(message)
+        logger.warning(f">>> {message}")
+
+    return pd.DataFrame(
+        values / anchors[ids],
+        index=frame.index,
+        columns=[col + suffix for col in columns],
+    )
@@ -1,3 +1,16 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+DOUBLING_CURVES = [  # period (days), name, color
+    (3, "2x ogni 3gg", "#3C1518"),
+    (7, "2x ogni settimana", "#A44200"),
+    (14, "2x ogni 2settimane", "#D58936"),
+]
+
+
 def watermark(fig, logo_y=None, annot_y=None, logo_h=None):
     margin = fig.layout["margin"]
     b = margin["b"]
@@ -51,3 +64,113 @@ def watermark(fig, logo_y=None, annot_y=None, logo_h=None):
         images=[logo], annotations=list(fig["layout"]["annotations"]) + [annot]
     )
     return fig
+
+
+@lru_cache(maxsize=256)
+def _doubling_curves(periods, length, start, offset):
+    days = offset + np.arange(length)
+    curves = start * np.exp2(days[None, :] / np.array(periods)[:, None])
+    curves.flags.writeable = False
+    return curves
+
+
+def doubling_curves(periods, length, start=100, offset=0) -> np.ndarray:
+    """Counts starting from `start` and doubling every `periods` days, over
+    days ``offset .. offset + length - 1``: one read-only row per period.
+
+    Curves are cached by their parameters and shared by all the figures.
+    """
+    return _doubling_curves(
+        tuple(float(p) for p in periods), int(length), start, offset
+    )
+
+
+def doubling_traces(
+    x_values, ymax, curves=DOUBLING_CURVES, start=100, **trace_kwargs
+):
+    """Dotted reference traces of counts doubling every `period` days from
+    `start`, one per (period, name, color) in `curves`, cut at `ymax`."""
+    x_values = np.asarray(x_values)
+    simulations = doubling_curves(
+        [period for period, _, _ in curves], len(x_values), start
+    )
+    traces = []
+    for simulation, (_, name, color) in zip(simulations, curves):
+        mask = simulation < ymax
+        traces.append(
+            go.Scatter(
+                x=x_values[mask],
+                y=simulation[mask].astype(np.int64),
+                line=dict(color=color, width=0.5, dash="dot"),
+                name=name,
+                mode="lines+markers",
+                **trace_kwargs
+            )
+        )
+    return traces
+
+
+def filter_dropdown(
+    data,
+    by,
+    x_col,
+    y_col,
+    trace_groups,
+    all_label,
+    title=None,
+    y_floor=None,
+    **menu_kwargs
+):
+    """Dropdown showing the traces of one value of `by` at a time, with the
+    axes zoomed on its extents of `x_col` and `y_col` in `data`.
+
+    `trace_groups` is the value of `by` of each trace of the figure, traces
+    whose value is not in `data` (e.g. reference curves) are always shown.
+    `title(label)` gives the title of each button, `y_floor` the lower end
+    of the y range of single groups. Extents come from one grouped
+    aggregation and the visibility of every trace for every button from one
+    comparison.
+    """
+    extents = data.groupby(by, observed=True).agg(
+        xmin=(x_col, "min"),
+        xmax=(x_col, "max"),
+        ymin=(y_col, "min"),
+        ymax=(y_col, "max"),
+    )
+    trace_groups = pd.Series(trace_groups, dtype=object)
+    order = [g for g in trace_groups.unique() if g in extents.index]
+    extents = extents.loc[order]
+
+    codes = pd.Index(order, dtype=object).get_indexer(trace_groups)
+    visible = (codes[None, :] == np.arange(len(order))[:, None]) | (
+        codes == -1
+    )
+    ymin = extents["ymin"] if y_floor is None else pd.Series(y_floor, order)
+
+    def button(label, visibility, xrange, yrange):
+        layout = {"yaxis": {"range": yrange}, "xaxis": {"range": xrange}}
+        if title is not None:
+            layout["title"] = title(label)
+        return dict(
+            label=label,
+            method="update",
+            args=[{"visible": visibility}, layout],
+        )
+
+    buttons = [
+        button(
+            all_label,
+            [True] * len(codes),
+            (data[x_col].min(), data[x_col].max()),
+            (data[y_col].min(), data[y_col].max()),
+        )
+    ] + [
+        button(
+            group,
+            visible[n].tolist(),
+            (extents["xmin"].iloc[n], extents["xmax"].iloc[n]),
+            (ymin.iloc[n], extents["ymax"].iloc[n]),
+        )
+        for n, group in enumerate(order)
+    ]
+    return dict(type="dropdown", buttons=buttons, **menu_kwargs)
@@ -0,0 +1,44 @@
+"""Fake `covid_health` for the modules importing it, when not installed.
+
+The parsers of the fake raise: tests patch the functions they exercise.
+"""
+import importlib.util
+import sys
+import types
+
+
+def _unavailable(*args, **kwargs):
+    raise RuntimeError("covid_health is not installed.")
+
+
+FAKE_COVID_HEALTH = {
+    "covid_health": {"__version__": "0"},
+    "covid_health.prep_ecdc": {"parse_covid_world_data": _unavailable},
+    "covid_health.prep_owid": {"parse_covid_tests": _unavailable},
+    "covid_health.prep_eurostat": {
+        "parse_eurostat_dataset": _unavailable,
+        "var": {
+            "eurostat": {"unit": {}, "geo": {}, "facility": {}, "isco08": {}}
+        },
+    },
+    "covid_health.utils": {"map_names": lambda name, language="it": name},
+    "covid_health.ita": {},
+    "covid_health.ita.prep_pcm_dpc": {"parse_covid_data": _unavailable},
+    "covid_health.ita.prep_istat": {"parse_istat_geodemo": _unavailable},
+    "covid_health.ita.prep_salutegov": {"parse_dataset": _unavailable},
+}
+
+
+def _install_fake_covid_health():
+    for name, attributes in FAKE_COVID_HEALTH.items():
+        module = types.ModuleType(name)
+        module.__path__ = []
+        vars(module).update(attributes)
+        sys.modules[name] = module
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(sys.modules[parent], child, module)
+
+
+if importlib.util.find_spec("covid_health") is None:
+    _install_fake_covid_health()
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+import pytest
+
+from covid_19_ita import analytics, ingest
+from covid_19_ita.analytics import (
+    doubling_time,
+    growth,
+    rolling_mean,
+    rt_ratio,
+)
+
+
+def test_doubling_time():
+    frame = pd.DataFrame(
+        {
+            "region": ["a"] * 4 + ["b"] * 4,
+            "cases": [0, 0, 5, 10, 4, 8, 8, 6],
+        }
+    )
+    days = doubling_time(frame, ["cases"], window=1, by="region")
+
+    np.testing.assert_array_equal(
+        days["cases_doubling"].to_numpy(),
+        [np.nan, np.nan, np.nan, 1.0, np.nan, 1.0, np.nan, np.nan],
+    )
+
+
+@pytest.fixture
+def daily():
+    # Two regions, rows interleaved and in time order within each region.
+    return pd.DataFrame(
+        {
+            "region": ["a", "b"] * 5,
+            "cases": [1, 10, 2, 20, 4, np.nan, 8, 40, 16, 80],
+        }
+    )
+
+
+def test_rolling_mean(daily):
+    mean = rolling_mean(daily, ["cases"], window=2, by="region")
+    np.testing.assert_allclose(
+        mean["cases_ma2"],
+        [np.nan, np.nan, 1.5, 15.0, 3.0, np.nan, 6.0, np.nan, 12.0, 60.0],
+    )
+    partial = rolling_mean(daily, ["cases"], 2, by="region", min_periods=1)
+    np.testing.assert_allclose(
+        partial["cases_ma2"],
+        [1.0, 10.0, 1.5, 15.0, 3.0, 20.0, 6.0, 40.0, 12.0, 60.0],
+    )
+
+
+def test_growth(daily):
+    rate = growth(daily, ["cases"], window=1, by="region")
+    np.testing.assert_allclose(
+        rate["cases_growth"],
+        [np.nan, np.nan, 1.0, 1.0, 1.0, np.nan, 1.0, np.nan, 1.0, 1.0],
+    )
+
+
+def test_rt_ratio(daily):
+    rt = rt_ratio(daily.iloc[::2], ["cases"], window=2)
+    np.testing.assert_allclose(rt["cases_rt"], [np.nan] * 3 + [4.0, 4.0])
+    assert rt.index.equals(daily.index[::2])
+
+
+def _series(days, revised=None):
+    frame = pd.DataFrame(
+        {
+            "region": np.repeat(["a", "b"], days),
+            "time": np.tile(pd.date_range("2020-03-01", periods=days), 2),
+            "cases": np.r_[np.arange(days), 2 * np.arange(days)] + 1.0,
+        }
+    )
+    if revised is not None:
+        frame.loc[revised, "cases"] += 5
+    return frame
+
+
+def test_update_recomputes_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_DIR", str(tmp_path))
+    derived = []
+    trends = analytics.trends
+
+    def spy(frame, *args, **kwargs):
+        derived.append(len(frame))
+        return trends(frame, *args, **kwargs)
+
+    monkeypatch.setattr(analytics, "trends", spy)
+
+    def update(frame):
+        return analytics.update(
+            "test", frame, keys=["region"], daily=["cases"], window=2
+        )
+
+    update(_series(20))
+    # Days 21-22 added and day 18 of region "a" revised: the 5 days from
+    # day 18 and 2 * RT_WINDOW days of context are derived per region.
+    fresh = _series(22, revised=17)
+    table = update(fresh)
+
+    full = fresh.assign(**trends(fresh, ["cases"], by=["region"], window=2))
+    pd.testing.assert_frame_equal(
+        table.reset_index(drop=True), full.reset_index(drop=True)
+    )
+    assert derived == [40, 2 * (5 + 8)]
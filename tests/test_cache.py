@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from covid_19_ita import cache, snapshot
+
+DPC_REGIONS = (
+    b"data,stato,codice_regione,denominazione_regione,terapia_intensiva,"
+    b"dimessi_guariti,deceduti,totale_casi,tamponi,totale_positivi\n"
+    b"2020-02-24T18:00:00,ITA,3,Lombardia,19,0,6,172,1463,166\n"
+    b"2020-02-24T18:00:00,ITA,5,Veneto,8,0,1,33,1845,32\n"
+)
+
+
+@pytest.fixture
+def fetched(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path))
+    urls = []
+
+    def fetch(url):
+        urls.append(url)
+        return DPC_REGIONS
+
+    monkeypatch.setattr(cache, "fetch", fetch)
+    return urls
+
+
+def test_parse_covid_data_parses_the_mirrored_bytes(fetched):
+    frame = cache.parse_covid_data("dpc-regions")
+
+    assert fetched == [cache.DPC_SOURCES["dpc-regions"]]
+    assert frame["time"].tolist() == [pd.Timestamp("2020-02-24")] * 2
+    assert frame["region"].tolist() == ["Lombardia", "Veneto"]
+    assert frame["tot_n_cases"].tolist() == [172, 33]
+    assert frame["n_tested"].tolist() == [1463, 1845]
+    assert frame["totale_positivi"].tolist() == [166, 32]
+
+
+def test_parse_covid_data_hits_the_snapshot(fetched, monkeypatch):
+    cache.parse_covid_data("dpc-regions")
+    monkeypatch.setattr(cache, "parse_dpc", pytest.fail)
+
+    assert len(cache.parse_covid_data("dpc-regions")) == 2
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from covid_19_ita import datasets
+
+
+@pytest.fixture
+def built():
+    frame = pd.DataFrame(
+        {
+            "region": pd.Categorical(["Lombardia", "Veneto"]),
+            "time": pd.to_datetime(["2020-03-01", "2020-03-02"]),
+            "cases": [1, 2],
+        }
+    )
+    datasets.register("test-regions", lambda: frame)
+    yield frame
+    datasets.register("test-regions", lambda: None)
+
+
+def test_writes_do_not_reach_the_memoized_frame(built):
+    frame = datasets.get("test-regions")
+    frame.loc[0, "cases"] = 10
+    frame.loc[0, "region"] = "Veneto"
+    frame["cases"] += 1
+    built.loc[1, "cases"] = 20
+
+    pd.testing.assert_frame_equal(
+        datasets.get("test-regions"),
+        pd.DataFrame(
+            {
+                "region": pd.Categorical(["Lombardia", "Veneto"]),
+                "time": pd.to_datetime(["2020-03-01", "2020-03-02"]),
+                "cases": [1, 2],
+            }
+        ),
+    )
+
+
+def test_exposed_arrays_are_read_only(built):
+    frame = datasets.get("test-regions")
+
+    with pytest.raises(ValueError):
+        frame["cases"].to_numpy()[0] = 10
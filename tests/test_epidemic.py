@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from covid_19_ita import epidemic
+from covid_19_ita.epidemic import Threshold, epidemic_start
+
+
+@pytest.fixture(autouse=True)
+def clear():
+    epidemic.clear()
+    yield
+    epidemic.clear()
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame(
+        {
+            "time": pd.to_datetime(["2020-03-01", "2020-03-02"] * 2),
+            "region": ["a", "a", "b", "b"],
+            "cases": [50, 150, 100, 200],
+        }
+    )
+
+
+def test_memoized_per_dataset_version(frame):
+    threshold = Threshold("cases", 100)
+    start = epidemic_start(frame, threshold, by="region", version="v1")
+
+    hit = epidemic_start(frame, threshold, by="region", version="v1")
+    miss = epidemic_start(frame, threshold, by="region", version="v2")
+    assert hit is start
+    assert miss is not start
+
+
+def test_filtered_frame_is_not_served_the_dataset_start(frame):
+    threshold = Threshold("cases", 100)
+    epidemic_start(frame, threshold, by="region", version="v1")
+    later = frame[frame["time"] > "2020-03-01"]
+
+    start = epidemic_start(later, threshold, by="region", version="v1")
+    assert start["b"] == pd.Timestamp("2020-03-02")
+
+
+def test_edited_frame_is_not_served_the_dataset_start(frame):
+    threshold = Threshold("cases", 100)
+    epidemic_start(frame, threshold, by="region", version="v1")
+    edited = frame.assign(cases=frame["cases"].where(frame["region"] != "a"))
+
+    start = epidemic_start(edited, threshold, by="region", version="v1")
+    assert list(start.index) == ["b"]
+    # Columns not read do not change the key.
+    extra = frame.assign(other=1)
+    hit = epidemic_start(extra, threshold, by="region", version="v1")
+    assert hit is epidemic_start(frame, threshold, by="region", version="v1")
@@ -0,0 +1,14 @@
+from covid_19_ita import export
+
+
+def test_split_figure_data_is_removed(tmp_path):
+    page = tmp_path / "figures" / "fig.html"
+    page.parent.mkdir()
+    export.write_split('{"data": [], "layout": {}}', str(page))
+
+    assert (tmp_path / "figures" / "fig.json").exists()
+    assert "fig.json" in page.read_text()
+
+    export.remove_split(str(page))
+    assert not (tmp_path / "figures" / "fig.json").exists()
+    export.remove_split(str(page))
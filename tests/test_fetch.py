@@ -0,0 +1,120 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from covid_19_ita import fetch
+
+FILES = {"/data.csv": b"a,b\n1,2\n", "/sheet.csv": b"c\n3\n"}
+# Served without a validator, as Google Sheets exports.
+NO_ETAG = {"/sheet.csv"}
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        content = FILES.get(self.path)
+        if content is None:
+            self.send_error(404)
+            return
+        etag = '"{}"'.format(hashlib.sha256(content).hexdigest()[:8])
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if self.path not in NO_ETAG:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    Handler.requests = []
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def mirror(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch, "MIRROR_DIR", str(tmp_path / "mirror"))
+    monkeypatch.setattr(fetch, "PROJECT_DIR", str(tmp_path / "repo"))
+    monkeypatch.setattr(fetch, "offline", False)
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    fetch.clear_prefetched()
+    yield tmp_path
+    fetch.clear_prefetched()
+
+
+def test_retrieve_revalidates_with_etag(server):
+    url = server + "/data.csv"
+    assert fetch.retrieve(url) == (FILES["/data.csv"], "miss")
+    assert fetch.retrieve(url) == (FILES["/data.csv"], "not-modified")
+    assert fetch.retrieve(url, revalidate=False)[1] == "hit"
+
+    etag = fetch.load_meta(url)["etag"]
+    assert Handler.requests == [("/data.csv", None), ("/data.csv", etag)]
+
+
+def test_retrieve_downloads_changed_source(server, monkeypatch):
+    url = server + "/data.csv"
+    fetch.retrieve(url)
+    monkeypatch.setitem(FILES, "/data.csv", b"a,b\n3,4\n")
+
+    assert fetch.retrieve(url) == (b"a,b\n3,4\n", "miss")
+    assert fetch.source_hash(url, revalidate=False) == (
+        hashlib.sha256(b"a,b\n3,4\n").hexdigest()
+    )
+
+
+def test_prefetch_revalidates_with_etag(server):
+    url = server + "/data.csv"
+    assert fetch.prefetch([url])[url][0] == "miss"
+    fetch.clear_prefetched()
+
+    assert fetch.prefetch([url])[url][0] == "not-modified"
+    assert fetch.fetch(url) == FILES["/data.csv"]
+    assert len(Handler.requests) == 2
+
+
+def test_repo_files_are_read_from_disk(mirror):
+    path = mirror / "repo" / "data" / "local file.csv"
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"x\n1\n")
+    url = fetch.REPO_RAW_URL + "data/local%20file.csv"
+
+    assert fetch.retrieve(url) == (b"x\n1\n", "local")
+    assert fetch.prefetch([url])[url] == ("local", 4, 0.0)
+    assert not (mirror / "mirror").exists()
+
+
+def test_offline_reads_the_mirror_only(server, monkeypatch):
+    url = server + "/data.csv"
+    fetch.retrieve(url)
+    monkeypatch.setattr(fetch, "offline", True)
+
+    assert fetch.retrieve(url) == (FILES["/data.csv"], "hit")
+    assert fetch.prefetch([url]) == {}
+    assert len(Handler.requests) == 1
+    with pytest.raises(FileNotFoundError):
+        fetch.retrieve(server + "/other.csv")
+
+
+def test_check_without_validator_is_unknown(server):
+    url = server + "/sheet.csv"
+    fetch.retrieve(url)
+
+    assert fetch.check([url])[url][0] == "unknown"
@@ -0,0 +1,24 @@
+from covid_19_ita import figcache
+from covid_19_ita.figures import tortuga_II_b
+
+
+def test_package_modules_are_collected_transitively():
+    names = figcache.package_modules(tortuga_II_b)
+
+    # Imported by tortuga_II_b itself, and through tortuga.
+    assert {"covid_19_ita.utils", "covid_19_ita.transforms"} <= set(names)
+    assert "covid_19_ita.epidemic" in names
+    assert "covid_19_ita.figures.tortuga" in names
+
+
+def test_code_version_changes_with_helper_modules(monkeypatch):
+    before = figcache.code_version(tortuga_II_b.fig_b001)
+    source_digest = figcache._source_digest
+
+    def edited(name):
+        if name == "covid_19_ita.epidemic":
+            return "edited"
+        return source_digest(name)
+
+    monkeypatch.setattr(figcache, "_source_digest", edited)
+    assert figcache.code_version(tortuga_II_b.fig_b001) != before
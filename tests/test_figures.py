@@ -0,0 +1,138 @@
+"""Figure builders on small categorical frames, as `compact` returns."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_19_ita.schema import compact
+
+
+@pytest.fixture
+def eurostat(monkeypatch):
+    from covid_19_ita.figures import tortuga_II_a
+
+    var = {
+        "eurostat": {
+            "unit": {"P_HTHAB": "Per 100 000 inhabitants"},
+            "geo": {"ITC4": "Lombardia", "ITH3": "Veneto"},
+            "facility": {"HBEDT": "Available beds in hospitals"},
+            "isco08": {
+                "OC221": "Medical doctors",
+                "OC222": "Nurses and midwives",
+            },
+        }
+    }
+    geos = ["DE", "FR", "IT", "ITC4", "ITH3"]
+    years = pd.to_datetime([f"{year}-01-01" for year in range(2001, 2018)])
+
+    def parse_eurostat_dataset(name):
+        field, codes = (
+            ("facility", ["HBEDT"])
+            if name == "hlth_rs_bdsrg"
+            else ("isco08", ["OC221", "OC222"])
+        )
+        index = pd.MultiIndex.from_product(
+            [geos, years, codes], names=["geo", "time", field]
+        )
+        frame = index.to_frame(index=False)
+        frame["unit"] = "P_HTHAB"
+        frame["value"] = np.arange(len(frame), dtype=float)
+        return frame
+
+    monkeypatch.setattr(tortuga_II_a.prep_eurostat, "var", var)
+    monkeypatch.setattr(
+        tortuga_II_a.prep_eurostat,
+        "parse_eurostat_dataset",
+        parse_eurostat_dataset,
+    )
+    return tortuga_II_a
+
+
+@pytest.fixture
+def world(monkeypatch):
+    from covid_19_ita.figures import tortuga_IV
+
+    geos = ["Italy", "South_Korea", "United_States_of_America"]
+    times = pd.date_range("2020-02-20", periods=30)
+    index = pd.MultiIndex.from_product([times, geos], names=["time", "geo"])
+    frame = index.to_frame(index=False)
+    growth = np.tile([1.3, 1.1, 1.4], len(times))
+    frame["active_cases"] = (
+        10 * frame.groupby("geo").cumcount().to_numpy() ** growth
+    ).round()
+    frame["n_deceased"] = (frame["active_cases"] // 20).astype(int)
+    names = {"South_Korea": "South Korea", "Italy": "Italy"}
+    tests = frame[["time", "geo"]].assign(
+        geo=frame["geo"].map(lambda geo: names.get(geo, "United States")),
+        tot_n_tests=frame["active_cases"] * 10,
+        tot_n_tests_pthab=frame["active_cases"] / 1000,
+    )
+
+    monkeypatch.setattr(
+        tortuga_IV, "pecdc", lambda: compact(frame, "ecdc")
+    )
+    monkeypatch.setattr(
+        tortuga_IV, "ptests", lambda: compact(tests, "owid-tests")
+    )
+    monkeypatch.setattr(tortuga_IV, "dataset_version", lambda name: None)
+    return tortuga_IV
+
+
+@pytest.mark.parametrize("name", ["fig_a001", "fig_a003", "fig_a004"])
+def test_eurostat_figures_relabel_categoricals(eurostat, name):
+    builder = getattr(eurostat, name).__wrapped__
+    fig = builder()
+
+    labels = {x for trace in fig.data for x in trace.x}
+    assert {"Lombardia", "<b>Italia</b>"} <= labels
+
+
+def test_covid_datasets_relabel_categoricals(world):
+    covid, tests = world.get_covid_datasets()
+
+    assert "United States" in set(covid["geo"])
+    assert tests["epidemic_start"].notna().all()
+
+
+@pytest.mark.parametrize(
+    "name", ["fig_a001", "fig_a002", "fig_a003", "fig_a004"]
+)
+def test_tortuga_iv_figures(world, name):
+    from covid_19_ita.figures import tortuga_IV_a
+
+    assert getattr(tortuga_IV_a, name)().data
+
+
+def test_regional_kpis_follow_population(monkeypatch):
+    from covid_19_ita import kpi
+    from covid_19_ita.figures import tortuga_II_c
+
+    frame = pd.DataFrame(
+        {
+            "time": pd.to_datetime(["2020-03-01", "2020-03-02"] * 2),
+            "region": ["Lombardia"] * 2 + ["Veneto"] * 2,
+            "n_tested": [10.0, 20.0, 30.0, 40.0],
+        }
+    )
+    versions = {
+        "dpc-regions": "dpc",
+        "dpc-regions-pop": "dpc",
+        "geo-population": "2019",
+    }
+    population = {"2019": 1000.0, "2020": 2000.0}
+    monkeypatch.setattr(
+        tortuga_II_c,
+        "get_pop_covid_regions",
+        lambda: frame.assign(
+            population=population[versions["geo-population"]]
+        ),
+    )
+    monkeypatch.setattr(tortuga_II_c, "dataset_version", versions.get)
+    kpi.clear()
+
+    def test_pthab():
+        fig = tortuga_II_c.fig_c001.__wrapped__()
+        return list(fig.data[0].y)
+
+    assert test_pthab() == [10.0, 20.0]
+    versions["geo-population"] = "2020"
+    assert test_pthab() == [5.0, 10.0]
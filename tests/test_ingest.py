@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+import pytest
+
+from covid_19_ita import ingest
+
+
+@pytest.fixture(autouse=True)
+def ingest_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def fresh():
+    return pd.DataFrame(
+        {
+            "region": ["a", "a", "b", "b"],
+            "time": pd.to_datetime(["2020-03-01", "2020-03-02"] * 2),
+            "n": [1, 2, 3, 4],
+        }
+    )
+
+
+def update(frame, version="v1"):
+    return ingest.update(
+        "test", frame, keys=["region"], derive=lambda f: f, version=version
+    )
+
+
+def test_update_rejects_duplicate_days(fresh):
+    with pytest.raises(ValueError, match="1 rows of test repeat"):
+        update(pd.concat([fresh, fresh.iloc[[1]]]))
+
+
+def test_first_changed_date_rejects_duplicate_days(fresh):
+    base = fresh.assign(**{ingest.HASH_COL: ingest.row_hashes(fresh, ["n"])})
+    revised = pd.concat([base, base.iloc[[3]]])
+    with pytest.raises(ValueError, match="1 rows of frame repeat"):
+        ingest.first_changed_date(base, revised, ["region"])
+
+
+def test_store_table_prunes_superseded_versions(fresh, ingest_dir):
+    update(fresh, "v1")
+    update(fresh.assign(n=fresh["n"] * 2), "v2")
+    (table,) = [name for name in os.listdir(ingest_dir) if "parquet" in name]
+    assert table == os.path.basename(ingest.table_paths("test", "v2")[0])
+
+    loaded, meta = ingest.load_table("test", "v2")
+    assert meta["version"] == "v2"
+    assert loaded["n"].tolist() == [2, 4, 6, 8]
+    assert ingest.load_table("test", "v1") == (None, None)
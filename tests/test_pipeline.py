@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from covid_19_ita.pipeline import LazyFrame
+
+
+@pytest.fixture
+def lazy():
+    return LazyFrame(
+        pd.DataFrame({"region": ["b", "a", "c"], "cases": [2, 1, 3]})
+    )
+
+
+def test_collect(lazy):
+    frame = lazy.filter("cases > 1").sort("region").select(["region"])
+
+    assert frame.collect()["region"].tolist() == ["b", "c"]
+
+
+def test_collect_raises_on_unknown_columns(lazy):
+    with pytest.raises(KeyError, match="deaths"):
+        lazy.select(["region", "deaths"]).collect()
+
+
+def test_derived_frames_share_masks(lazy, monkeypatch):
+    evaluated = []
+    eval_ = lazy.frame.eval
+
+    def spy(condition):
+        evaluated.append(condition)
+        return eval_(condition)
+
+    monkeypatch.setattr(lazy.frame, "eval", spy)
+    small = lazy.filter("cases > 1").filter("region != 'c'")
+    large = lazy.filter(["region != 'c'", "cases > 0"])
+
+    assert small.collect()["region"].tolist() == ["b"]
+    assert large.collect()["region"].tolist() == ["b", "a"]
+    assert evaluated == ["cases > 1", "region != 'c'", "cases > 0"]
+
+
+def test_filter_rejects_local_variables(lazy):
+    threshold = 1  # noqa: F841
+    with pytest.raises(ValueError, match="local variables"):
+        lazy.filter(["cases > 0", "cases > @threshold"])
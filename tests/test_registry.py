@@ -0,0 +1,15 @@
+from covid_19_ita import cache, fetch, registry
+
+
+def test_fingerprint_records_every_input(monkeypatch):
+    monkeypatch.setattr(fetch, "source_hash", lambda url, **kwargs: url)
+    monkeypatch.setattr(cache, "dataset_version", lambda name, **kw: name)
+    figures = registry.load(["covid_19_ita.figures.hc_saturation"])
+
+    record = registry.fingerprint(figures["fig_010004"])
+
+    assert set(record["inputs"]) == {
+        cache.DPC_SOURCES["dpc-regions"],
+        "dpc-regions",
+        "salutegov-hospital-beds",
+    }
@@ -0,0 +1,17 @@
+import pytest
+from click.testing import CliRunner
+
+from covid_19_ita import hydrate
+from covid_19_ita.render import fetch
+
+
+@pytest.mark.parametrize(
+    "status, exit_code", [("fresh", 0), ("unknown", 0), ("stale", 1)]
+)
+def test_fetch_check_fails_on_stale_sources(monkeypatch, status, exit_code):
+    rows = [("ecdc", "fresh", 10, 0.0), ("owid-tests", status, 10, 0.0)]
+    monkeypatch.setattr(hydrate, "check", lambda per_host: rows)
+
+    result = CliRunner().invoke(fetch, ["--check"])
+    assert result.exit_code == exit_code
+    assert f"{status:<13}" in result.output
@@ -0,0 +1,58 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_19_ita.figures.tortuga import derive_dpc_regions
+
+
+def derive_dpc_regions_loop(regioni):
+    """Per-region implementation replaced by `derive_dpc_regions`."""
+
+    def decumulate(dataframe, col, newcol, first_val=0):
+        series = dataframe[col]
+        dataframe[newcol] = np.append(
+            [first_val], series.iloc[1:].values - series.iloc[:-1].values
+        )
+        return dataframe
+
+    ssets = []
+    with warnings.catch_warnings(record=True):
+        for ix, sset in regioni.groupby("region", observed=True):
+            sset["being_tested"] = np.append(
+                [0], sset["n_tested"].values[1:] - sset["n_tested"].values[:-1]
+            )
+            sset.loc[sset["being_tested"].values < 0, "being_tested"] = 0
+            sset = decumulate(sset, "n_deceased", "new_deceased")
+            sset = decumulate(sset, "n_discharged_recovered", "new_discharged")
+            ssets.append(sset.sort_values("time"))
+    return pd.concat(ssets)
+
+
+@pytest.fixture
+def regioni():
+    rng = np.random.default_rng(0)
+    regions = [f"Region {i:02d}" for i in range(21)]
+    times = pd.date_range("2020-02-24", periods=60)
+    frame = pd.DataFrame(
+        {
+            "time": np.repeat(times, len(regions)),
+            "region": pd.Categorical(np.tile(regions, len(times))),
+        }
+    )
+    for col in ["n_tested", "n_deceased", "n_discharged_recovered"]:
+        daily = rng.integers(-20, 200, len(frame))
+        frame[col] = (
+            pd.Series(daily).groupby(frame["region"]).cumsum().to_numpy()
+        ).astype(np.int32)
+    # Sorted by date with the regions interleaved, as published.
+    return frame
+
+
+def test_derive_dpc_regions_matches_loop(regioni):
+    pd.testing.assert_frame_equal(
+        derive_dpc_regions(regioni.copy()),
+        derive_dpc_regions_loop(regioni.copy()),
+        check_dtype=False,
+    )
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_19_ita.transforms import anchor, decumulate
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame(
+        {
+            "region": ["a", "a", None, "b"],
+            "time": pd.to_datetime(["2020-03-01", "2020-03-02"] * 2),
+            "n": [1.0, 2.0, 3.0, 4.0],
+        }
+    )
+
+
+def test_anchor_raises_on_missing_keys(frame):
+    with pytest.raises(ValueError, match="1 rows have a missing key"):
+        anchor(frame, ["n"], "2020-03-01", by="region")
+
+
+def test_decumulate_raises_on_missing_keys(frame):
+    with pytest.raises(ValueError, match="1 rows have a missing key"):
+        decumulate(frame.astype({"region": "category"}), ["n"], by="region")
+
+
+@pytest.fixture
+def revised():
+    # Region "a" is revised down on the third day, rows are interleaved.
+    return pd.DataFrame(
+        {
+            "region": ["a", "b", "a", "b", "a", "b", "a", "b"],
+            "n": [1, 10, 3, 10, 2, 12, 5, 15],
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "negative, first, expected",
+    [
+        ("keep", 0, [0, 2, -1, 3]),
+        ("clip", 0, [0, 2, 0, 3]),
+        ("carry", 0, [0, 2, 0, 2]),
+        ("carry", "cumulative", [1, 2, 0, 2]),
+        ("redistribute", 0, [0, 1, 0, 3]),
+        ("redistribute", "cumulative", [1, 1, 0, 3]),
+    ],
+)
+def test_decumulate_negative_policies(revised, negative, first, expected):
+    deltas = decumulate(
+        revised, {"n": "new"}, by="region", first=first, negative=negative
+    )
+
+    assert deltas.index.equals(revised.index)
+    assert deltas["new"].tolist()[::2] == expected
+    b_first = 10 if first == "cumulative" else 0
+    assert deltas["new"].tolist()[1::2] == [b_first, 0, 2, 3]
+
+
+def test_decumulate_first_nan(revised):
+    deltas = decumulate(revised, ["n"], by="region", first=np.nan)
+
+    assert np.isnan(deltas["n"].to_numpy()[:2]).all()
+    assert deltas["n"].tolist()[2:] == [2.0, 0.0, -1.0, 2.0, 3.0, 3.0]
+
+
+def test_decumulate_rejects_unknown_policy(revised):
+    with pytest.raises(ValueError, match="negative must be one of"):
+        decumulate(revised, ["n"], negative="drop")
+
+
+@pytest.fixture
+def regions():
+    return pd.DataFrame(
+        {
+            "region": ["a", "b", "a", "b", "c", "c"],
+            "zone": ["n", "s", "n", "s", "n", "n"],
+            "time": pd.to_datetime(["2020-03-01"] * 2 + ["2020-03-02"] * 2
+                                   + ["2020-03-02", "2020-03-03"]),
+            "n": [2.0, 0.0, 3.0, 5.0, 4.0, 6.0],
+            "m": [4.0, 5.0, 2.0, 10.0, 1.0, 1.0],
+        }
+    )
+
+
+def test_anchor_values(regions):
+    out = anchor(regions, ["n", "m"], "2020-03-01", by="region")
+    assert list(out.columns) == ["n_anchored", "m_anchored"]
+    np.testing.assert_allclose(
+        out["m_anchored"], [1.0, 1.0, 0.5, 2.0, np.nan, np.nan]
+    )
+    # Region b has a zero anchor in n, region c no row at the anchor date.
+    np.testing.assert_allclose(
+        out["n_anchored"], [1.0, np.nan, 1.5, np.nan, np.nan, np.nan]
+    )
+
+
+def test_anchor_without_groups(regions):
+    out = anchor(regions.iloc[:1], ["n"], "2020-03-01")
+    np.testing.assert_allclose(out["n_anchored"], [1.0])
+
+
+@pytest.mark.parametrize(
+    "by, names",
+    [("region", ["b: n", "c: n", "c: m"]),
+     (["region", "zone"], ["b/s: n", "c/n: n", "c/n: m"])],
+)
+def test_anchor_names_invalid_groups(regions, by, names):
+    with pytest.raises(ValueError) as error:
+        anchor(regions, ["n", "m"], "2020-03-01", by=by, errors="raise")
+    assert f"3 group/column pairs ({', '.join(names)})" in str(error.value)
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from covid_19_ita.utils import filter_dropdown
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame(
+        {
+            "region": pd.Categorical(["a", "a", "b", "b"], ["a", "b", "c"]),
+            "day": [0, 4, 1, 9],
+            "cases": [100, 400, 150, 900],
+        }
+    )
+
+
+def test_filter_dropdown(data):
+    menu = filter_dropdown(
+        data,
+        by="region",
+        x_col="day",
+        y_col="cases",
+        # Two traces of region b, one of a and a reference curve.
+        trace_groups=["b", "a", "b", "2x ogni 3gg"],
+        all_label="All",
+        title=lambda label: f"Cases: {label}",
+        direction="down",
+    )
+    assert menu["type"] == "dropdown" and menu["direction"] == "down"
+
+    buttons = {button["label"]: button["args"] for button in menu["buttons"]}
+    assert list(buttons) == ["All", "b", "a"]
+    visible = {label: args[0]["visible"] for label, args in buttons.items()}
+    assert visible == {
+        "All": [True, True, True, True],
+        "b": [True, False, True, True],
+        "a": [False, True, False, True],
+    }
+    ranges = {
+        label: (args[1]["xaxis"]["range"], args[1]["yaxis"]["range"])
+        for label, args in buttons.items()
+    }
+    assert ranges == {
+        "All": ((0, 9), (100, 900)),
+        "b": ((1, 9), (150, 900)),
+        "a": ((0, 4), (100, 400)),
+    }
+    assert buttons["a"][1]["title"] == "Cases: a"
+
+
+def test_filter_dropdown_y_floor(data):
+    menu = filter_dropdown(
+        data, "region", "day", "cases", ["a", "b"], "All", y_floor=10
+    )
+    layouts = [button["args"][1] for button in menu["buttons"]]
+    assert [layout["yaxis"]["range"] for layout in layouts] == [
+        (100, 900),
+        (10, 400),
+        (10, 900),
+    ]
+    assert "title" not in layouts[0]